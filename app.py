@@ -1,78 +1,55 @@
-import json
-from datetime import datetime
+"""
+Main Streamlit App: AI-Powered Personal Financial Advisor Prototype
+
+- Integrates all modules for a holistic, explainable, goal-oriented advisor.
+- UI for profile/goals, plan generation, explanations, and progress visualization.
+- Demonstrates research contributions: transparency and personalization.
+"""
+
+# Module docstring first: Streamlit "magic" would otherwise render it before set_page_config.
+import copy
 import os
-import smtplib
-from email.mime.text import MIMEText
+import time
+from datetime import date
 import streamlit as st
+from modules import activity_log, cache, metrics, notifications
+from modules import data_manager, planning_engine, explanation_engine, reminders
+# pandas and the heavier modules (projection, Monte Carlo, charts, export, history,
+# progress) are imported where they are used, so the login page starts without them
 
-# --- Email sending utility (simulated, ready for real SMTP) ---
+# --- Email sending (queued and delivered in the background, see modules/notifications.py) ---
 def send_email(to_email, subject, body):
     """
-    Simulated email sender. To enable real email, configure SMTP below.
+    Queue an email for background delivery and return immediately.
+    Real SMTP is enabled with the FINAI_SMTP_* environment variables.
     """
-    # --- Simulated: print to Streamlit ---
-    st.info(f"Simulated email sent to {to_email}: {subject}\n{body}")
-    # --- Real email (uncomment and configure to enable) ---
-    # smtp_server = 'smtp.example.com'
-    # smtp_port = 587
-    # smtp_user = 'your_email@example.com'
-    # smtp_password = 'your_password'
-    # msg = MIMEText(body)
-    # msg['Subject'] = subject
-    # msg['From'] = smtp_user
-    # msg['To'] = to_email
-    # with smtplib.SMTP(smtp_server, smtp_port) as server:
-    #     server.starttls()
-    #     server.login(smtp_user, smtp_password)
-    #     server.sendmail(smtp_user, [to_email], msg.as_string())
+    notifications.send_email(to_email, subject, body)
+    st.info(f"Email queued for {to_email}: {subject}")
 
-# --- Simple user database (for demo only) ---
+# --- Activity log (append-only JSONL, see modules/activity_log.py) ---
 ACTIVITY_LOG_DIR = "data"
 
-def get_activity_log_path(username):
-    return os.path.join(ACTIVITY_LOG_DIR, f"{username}_activity.json")
-
-def log_user_activity(username, action, details=None):
-    path = get_activity_log_path(username)
-    entry = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "action": action,
-        "details": details or ""
-    }
-    logs = []
-    if os.path.exists(path):
-        try:
-            with open(path, "r") as f:
-                logs = json.load(f)
-        except Exception:
-            logs = []
-    logs.insert(0, entry)  # newest first
-    with open(path, "w") as f:
-        json.dump(logs, f, indent=2)
-
-def get_user_activity(username, limit=10):
-    path = get_activity_log_path(username)
-    if os.path.exists(path):
+def log_user_activity(username, action, details=None, goal=None):
+    with metrics.timed("activity_write"):
+        activity_log.log_user_activity(username, action, details, log_dir=ACTIVITY_LOG_DIR, goal=goal)
+    cache.default_cache.invalidate(username, "activity")
+
+def get_cached_activity_page(username, goal=None, page=0, page_size=7):
+    """One page of (optionally goal-filtered) activity from the goal index, cached until the log changes."""
+    def query():
         try:
-            with open(path, "r") as f:
-                logs = json.load(f)
-            return logs[:limit]
+            return activity_log.query_activity(username, goal=goal, page=page, page_size=page_size, log_dir=ACTIVITY_LOG_DIR)
         except Exception:
-            return []
-    return []
-"""
-Main Streamlit App: AI-Powered Personal Financial Advisor Prototype
-
-- Integrates all modules for a holistic, explainable, goal-oriented advisor.
-- UI for profile/goals, plan generation, explanations, and progress visualization.
-- Demonstrates research contributions: transparency and personalization.
-"""
-
+            return [], False
+    with metrics.timed("activity_read"):
+        return cache.default_cache.get(
+            username, "activity", ("page", goal, page, page_size), query,
+            lambda: activity_log.log_version(username, ACTIVITY_LOG_DIR),
+        )
 
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from modules import data_manager, planning_engine, explanation_engine
+# Cross-user deadline reminders: run in-process only when enabled, else via python -m modules.reminders
+if os.environ.get("FINAI_REMINDERS") == "1":
+    reminders.get_scheduler()
 
 st.set_page_config(page_title="AI Financial Advisor Prototype", layout="wide")
 
@@ -83,37 +60,37 @@ USERS = {
     "demo": "demo"
 }
 
-def get_user_data_path(username):
-    return os.path.join("data", f"{username}_user.json")
-
 def load_user_data_for_user(username):
-    path = get_user_data_path(username)
-    if not os.path.exists(path):
-        # Copy default data for new user
-        import shutil
-        shutil.copyfile(os.path.join("data", "synthetic_user.json"), path)
-    # Patch: ensure file is valid, else reset
-    try:
-        with open(path, "r") as f:
-            import json
-            json.load(f)
-    except Exception:
-        os.remove(path)
-        import shutil
-        shutil.copyfile(os.path.join("data", "synthetic_user.json"), path)
-    # Use data_manager but override DATA_PATH
-    orig_path = data_manager.DATA_PATH
-    data_manager.DATA_PATH = path
-    data = data_manager.load_user_data()
-    data_manager.DATA_PATH = orig_path
-    return data
-
-def save_user_data_for_user(username, data):
-    path = get_user_data_path(username)
-    orig_path = data_manager.DATA_PATH
-    data_manager.DATA_PATH = path
-    data_manager.save_user_data(data)
-    data_manager.DATA_PATH = orig_path
+    return data_manager.load_profile(username)
+
+def flush_goal_session(session):
+    """Write pending profile/goal edits once and refresh the cache without a reload."""
+    with metrics.timed("profile_save"):
+        written = session.flush()
+    if written:
+        version = data_manager.get_store().version(session.username)
+        reminders.profile_saved(session.username, session.data, version)
+        cache.default_cache.put(session.username, "profile", "user_data", copy.deepcopy(session.data), version)
+        if session.goals_df is not None:
+            cache.default_cache.put(session.username, "profile", "goals_df", session.goals_df, version)
+    return written
+
+def get_cached_profile_value(username, key, compute):
+    """Value derived from the stored profile, reused across reruns until it is saved again."""
+    return cache.default_cache.get(
+        username, "profile", key, compute,
+        lambda: data_manager.get_store().version(username),
+    )
+
+def build_calendar_df(goals):
+    import pandas as pd
+    calendar_df = pd.DataFrame([
+        {"Goal": g["name"], "Deadline": g["deadline"], "Target (₹)": g["target_amount"], "Priority": g["priority"], "Current (₹)": g["current_amount"]}
+        for g in goals
+    ])
+    if not calendar_df.empty:
+        calendar_df = calendar_df.sort_values("Deadline")
+    return calendar_df
 
 # --- Login/Logout logic ---
 if "logged_in" not in st.session_state:
@@ -154,14 +131,23 @@ if not st.session_state.logged_in:
     st.stop()
 
 # --- Main App (after login) ---
+import pandas as pd
+rerun_started = time.perf_counter()
 username = st.session_state.username
-user_data = load_user_data_for_user(username)
+# Display only: recording is process-wide, so it stays under FINAI_METRICS
+show_perf_panel = st.sidebar.checkbox("⏱️ Show performance panel", key="show_perf_panel")
+# Cached profile is shared across reruns/sessions; mutate a private copy
+with metrics.timed("profile_load"):
+    stored_user_data = get_cached_profile_value(username, "user_data", lambda: load_user_data_for_user(username))
+user_data = copy.deepcopy(stored_user_data)
 income = user_data["income"]
 expenses = user_data["expenses"]
 risk_profile = user_data["risk_profile"]
 goals = user_data["goals"]
-
-
+with metrics.timed("goals_dataframe"):
+    goals_df = get_cached_profile_value(username, "goals_df", lambda: data_manager.get_goals_dataframe(stored_user_data["goals"]))
+# Collects this rerun's edits; flushed once at the end (or before st.rerun)
+goal_session = data_manager.GoalSession(username, user_data, goals_df)
 
 # --- Calculate monthly savings before dashboard ---
 monthly_savings = data_manager.compute_monthly_savings(income, expenses)
@@ -192,48 +178,16 @@ if home_loan_goals:
                    "This is a reminder to review your Home Loan goal and repayment plan in FinAI Advisor.")
 
 # --- Calendar View of Goal Deadlines ---
-import pandas as pd
 st.markdown("<hr>", unsafe_allow_html=True)
 st.subheader("📅 Goal Progress Chart")
-calendar_df = pd.DataFrame([
-    {"Goal": g["name"], "Deadline": g["deadline"], "Target (₹)": g["target_amount"], "Priority": g["priority"], "Current (₹)": g["current_amount"]}
-    for g in goals
-])
+calendar_df = get_cached_profile_value(username, "calendar_df", lambda: build_calendar_df(stored_user_data["goals"]))
 if not calendar_df.empty:
-    calendar_df = calendar_df.sort_values("Deadline")
     st.dataframe(calendar_df, use_container_width=True)
-    # --- Improved progress bar chart with log scale and grid ---
-    import matplotlib.pyplot as plt
-    import numpy as np
-    fig, ax = plt.subplots(figsize=(8, 0.6 * len(calendar_df) + 1))
-    ylabels = list(calendar_df["Goal"])
-    current = calendar_df["Current (₹)"]
-    target = calendar_df["Target (₹)"]
-    bar_width = 0.35
-    y = np.arange(len(ylabels))
-    # Use log scale for x-axis if range is large
-    max_target = max(target)
-    min_target = min(target)
-    use_log = max_target > 10 * max(min_target, 1)
-    # Plot bars
-    ax.barh(y - bar_width/2, target, height=bar_width, color="#e0e0e0", label="Target")
-    ax.barh(y + bar_width/2, current, height=bar_width, color="#4f8cff", label="Current")
-    # Add value labels
-    for i, (c, t) in enumerate(zip(current, target)):
-        ax.text(c, i + bar_width/2, f"₹{c:.0f}", va='center', ha='left', fontsize=9, color="#4f8cff", weight='bold')
-        ax.text(t, i - bar_width/2, f"₹{t:.0f}", va='center', ha='right', fontsize=9, color="#888888")
-    ax.set_yticks(y)
-    ax.set_yticklabels(ylabels)
-    ax.set_xlabel("Amount (₹)")
-    ax.legend(loc='upper right')
-    ax.grid(axis='x', linestyle='--', alpha=0.5)
-    if use_log:
-        ax.set_xscale('log')
-        ax.set_xlim(left=max(1, min(current.min(), target.min())), right=max(current.max(), target.max())*1.2)
-    else:
-        ax.set_xlim(left=0, right=max(current.max(), target.max())*1.2)
-    plt.tight_layout()
-    st.pyplot(fig)
+    # --- Improved progress bar chart with log scale and grid (memoized PNG) ---
+    from modules import charts
+    with metrics.timed("chart_render"):
+        chart_png = charts.render_goal_progress_chart(calendar_df["Goal"], calendar_df["Current (₹)"], calendar_df["Target (₹)"])
+    st.image(chart_png)
 else:
     st.info("No goals to display in chart.")
 
@@ -242,12 +196,15 @@ st.markdown("<hr>", unsafe_allow_html=True)
 st.subheader("🕒 Recent Activity (Filter by Goal)")
 goal_names = [g["name"] for g in goals]
 selected_goal = st.selectbox("Select a goal to filter activity log:", ["All Goals"] + goal_names, key="activity_goal_filter")
-activity = get_user_activity(username, limit=30)
-if selected_goal != "All Goals":
-    activity = [a for a in activity if selected_goal.lower() in a["details"].lower()]
+activity_page = st.number_input("Page", min_value=1, value=1, step=1, key="activity_page") - 1
+activity, more_activity = get_cached_activity_page(
+    username, None if selected_goal == "All Goals" else selected_goal, activity_page
+)
 if activity:
-    for entry in activity[:7]:
+    for entry in activity:
         st.markdown(f"- <b>{entry['timestamp']}</b>: {entry['action']} {entry['details']}", unsafe_allow_html=True)
+    if more_activity:
+        st.caption("Older entries on the next page.")
 else:
     st.info("No recent activity for this goal yet.")
 
@@ -256,7 +213,6 @@ if st.sidebar.button("Logout"):
     logout()
 
 # --- Dashboard Summary ---
-monthly_savings = data_manager.compute_monthly_savings(income, expenses)
 st.markdown(f"<div style='font-size:1.2em;'><b>Welcome, {username}!</b></div>", unsafe_allow_html=True)
 st.markdown(f"<span style='font-size:1.1em;'>💰 <b>Monthly Savings:</b> ₹{monthly_savings:.2f}</span>", unsafe_allow_html=True)
 st.markdown(f"<span style='font-size:1.1em;'>🎯 <b>Active Goals:</b> {len(goals)}</span>", unsafe_allow_html=True)
@@ -286,14 +242,10 @@ with st.sidebar.form("profile_form"):
     expenses = st.number_input("Monthly Expenses (₹)", min_value=0.0, value=float(expenses), step=100.0)
     risk_profile = st.selectbox("Risk Profile", ["Low", "Medium", "High"], index=["Low", "Medium", "High"].index(risk_profile))
     email = st.text_input("Email", value=user_data.get("email", f"{username}@example.com"), key="profile_email")
-    st.markdown("*Risk profile influences long-term advice (not implemented in this prototype).*")
+    st.markdown("*Risk profile sets the simulated returns used for goal success probabilities.*")
     submitted_profile = st.form_submit_button("Save Profile")
     if submitted_profile:
-        user_data["income"] = income
-        user_data["expenses"] = expenses
-        user_data["risk_profile"] = risk_profile
-        user_data["email"] = email
-        save_user_data_for_user(username, user_data)
+        goal_session.set_profile(income=income, expenses=expenses, risk_profile=risk_profile, email=email)
         log_user_activity(username, "Updated profile", f"Income: ₹{income}, Expenses: ₹{expenses}, Risk: {risk_profile}, Email: {email}")
         st.success("Profile updated. Please refresh to see changes.")
 
@@ -315,19 +267,17 @@ if st.session_state.get("show_add_goal", False):
                 "deadline": str(deadline),
                 "priority": priority
             }
-            goals.append(new_goal)
-            user_data["goals"] = goals
-            save_user_data_for_user(username, user_data)
-            log_user_activity(username, "Added new goal", f"{new_name} (Target: ₹{target}, Deadline: {deadline})")
+            goal_session.add_goal(new_goal)
+            flush_goal_session(goal_session)
+            log_user_activity(username, "Added new goal", f"{new_name} (Target: ₹{target}, Deadline: {deadline})", goal=new_name)
             if "home loan" in new_name.lower():
-                log_user_activity(username, "Home Loan goal added", f"{new_name}")
+                log_user_activity(username, "Home Loan goal added", f"{new_name}", goal=new_name)
             st.success("Goal added!")
             st.session_state.show_add_goal = False
             st.rerun()
 
 # --- Manage Goals (in sidebar) ---
 st.sidebar.subheader("Manage Goals")
-goals_df = data_manager.get_goals_dataframe(goals)
 for idx, row in goals_df.iterrows():
     with st.sidebar.expander(f"Edit Goal: {row['name']}"):
         new_name = st.text_input(f"Goal Name", value=row["name"], key=f"name_{idx}")
@@ -336,24 +286,17 @@ for idx, row in goals_df.iterrows():
         deadline = st.date_input(f"Deadline", value=row["deadline"].date(), key=f"deadline_{idx}")
         priority = st.slider(f"Priority (1=Low, 5=High)", 1, 5, int(row["priority"]), key=f"priority_{idx}")
         if st.button("Save Goal", key=f"save_{idx}"):
-            old_goal = goals_df.loc[idx].to_dict()
-            goals_df.at[idx, "name"] = new_name
-            goals_df.at[idx, "target_amount"] = target
-            goals_df.at[idx, "current_amount"] = current
-            goals_df.at[idx, "deadline"] = pd.to_datetime(deadline)
-            goals_df.at[idx, "priority"] = priority
-            # Save all goals at once
-            user_data = data_manager.update_goals_in_data(user_data, goals_df)
-            save_user_data_for_user(username, user_data)
-            log_user_activity(username, "Updated goal", f"{new_name} (Target: ₹{target}, Current: ₹{current}, Deadline: {deadline})")
+            # Buffered: only this goal is written, once, at the end of the rerun
+            goal_session.update_goal(idx, name=new_name, target_amount=target, current_amount=current,
+                                     deadline=deadline, priority=priority)
+            log_user_activity(username, "Updated goal", f"{new_name} (Target: ₹{target}, Current: ₹{current}, Deadline: {deadline})", goal=new_name)
             if "home loan" in new_name.lower():
-                log_user_activity(username, "Home Loan goal updated", f"{new_name}")
+                log_user_activity(username, "Home Loan goal updated", f"{new_name}", goal=new_name)
             st.success("Goal updated. Please refresh to see changes.")
 
 # --- Goal Completion & Milestone Tracking ---
 if "completed_goals" not in user_data:
-    user_data["completed_goals"] = []
-    save_user_data_for_user(username, user_data)
+    goal_session.set_profile(completed_goals=[])
 
 st.markdown("<hr>", unsafe_allow_html=True)
 st.subheader("✅ Mark Goals as Completed")
@@ -362,9 +305,9 @@ completed_goal_names = user_data["completed_goals"]
 if active_goal_names:
     selected_complete = st.selectbox("Select a goal to mark as completed:", ["-- Select --"] + active_goal_names, key="complete_goal_select")
     if selected_complete != "-- Select --" and st.button("Mark as Completed"):
-        user_data["completed_goals"].append(selected_complete)
-        save_user_data_for_user(username, user_data)
-        log_user_activity(username, "Completed goal", selected_complete)
+        goal_session.set_profile(completed_goals=user_data["completed_goals"] + [selected_complete])
+        flush_goal_session(goal_session)
+        log_user_activity(username, "Completed goal", selected_complete, goal=selected_complete)
         st.success(f"Goal '{selected_complete}' marked as completed!")
         st.rerun()
 else:
@@ -377,30 +320,63 @@ if completed_goal_names:
 else:
     st.info("No completed milestones yet.")
 
+# --- Goal History: goals as they were on a past date ---
+if st.checkbox("🕰️ Show goals as of a past date", key="show_goal_history"):
+    from modules import goal_history
+    history_date = st.date_input("As of", key="goal_history_date")
+    with metrics.timed("goal_history"):
+        past = goal_history.goals_as_of(username, history_date)
+    if past is None:
+        st.info("No goal history recorded before that date.")
+    else:
+        st.dataframe(pd.DataFrame(past["goals"]), use_container_width=True)
+        if past["completed_goals"]:
+            st.caption("Completed by then: " + ", ".join(past["completed_goals"]))
+
 # --- Main Content: Allocation & Progress ---
 if st.session_state.get("show_allocate", False):
     st.subheader("🎯 Allocate to Goals")
+    planning_mode = st.radio(
+        "Allocation strategy",
+        planning_engine.PLANNING_MODES,
+        format_func=lambda m: {"greedy": "Greedy (fill highest priority first)", "weighted": "Weighted (share by priority)"}[m],
+        horizontal=True,
+        key="planning_mode",
+    )
     if st.button("Generate Plan"):
-        # Recompute DataFrame in case of updates
-        goals_df = data_manager.get_goals_dataframe(user_data["goals"])
-        allocations, reason_tags = planning_engine.plan_allocations(goals_df, monthly_savings)
-        explanations = explanation_engine.explain_allocations(reason_tags)
-
-        # Update current_amounts for simulation and save
-        for idx, row in goals_df.iterrows():
-            alloc = allocations.get(row["name"], 0.0)
-            goals_df = data_manager.update_goal(goals_df, idx, alloc)
-        user_data = data_manager.update_goals_in_data(user_data, goals_df)
-        save_user_data_for_user(username, user_data)
+        from modules import goal_records, monte_carlo, projection_engine
+        # Planning runs on lightweight records built from this rerun's goals (no pandas)
+        with metrics.timed("plan_allocations"):
+            goal_records_list = goal_records.build_records(user_data["goals"])
+            allocations, reason_tags = goal_records.plan_records(goal_records_list, monthly_savings, mode=planning_mode)
+        # Frame reflecting any edits made earlier in this rerun, for projection and simulation
+        with metrics.timed("goals_dataframe"):
+            goals_df = goal_session.goals_df
+            if goals_df is None:
+                goals_df = data_manager.get_goals_dataframe(user_data["goals"])
+        with metrics.timed("explain_allocations"):
+            explanations = explanation_engine.explain_allocations(reason_tags)
+        with metrics.timed("project_plan"):
+            projected_allocs, completion = projection_engine.project_plan(goals_df, monthly_savings, mode=planning_mode)
+        with metrics.timed("monte_carlo"):
+            success_probs = monte_carlo.simulate_goal_success(goals_df, monthly_savings, risk_profile, workers=1)
+
+        # Update current_amounts for simulation (saved with the rest of this rerun's edits)
+        records_by_name = {}
+        for idx, record in enumerate(goal_records_list):
+            records_by_name.setdefault(record.name, record)
+            alloc = allocations.get(record.name, 0.0)
+            if alloc:
+                goal_session.allocate(idx, alloc)
 
         # Show Allocations Table
         alloc_df = pd.DataFrame([
             {
                 "Goal": g,
                 "Allocated (₹)": allocations[g],
-                "Required This Month (₹)": float(goals_df[goals_df["name"] == g]["required_monthly"].values[0]),
-                "Months Left": int(goals_df[goals_df["name"] == g]["months_left"].values[0]),
-                "Priority": int(goals_df[goals_df["name"] == g]["priority"].values[0])
+                "Required This Month (₹)": float(records_by_name[g].required_monthly),
+                "Months Left": int(records_by_name[g].months_left),
+                "Priority": int(records_by_name[g].priority)
             }
             for g in allocations
         ])
@@ -412,6 +388,23 @@ if st.session_state.get("show_allocate", False):
         for g, exp in explanations.items():
             st.markdown(f"- **{g}**: {exp.replace('$', '₹')}")
 
+        # Show multi-month projection
+        st.subheader("Projected Goal Completion")
+        completion_df = pd.DataFrame({
+            "Goal": completion.index,
+            "Months to Complete": completion.values,
+            "Estimated Completion": projection_engine.completion_dates(completion, data_manager.TODAY).dt.strftime("%b %Y").fillna("Beyond horizon").values,
+        })
+        st.dataframe(completion_df, use_container_width=True)
+        st.area_chart(projected_allocs)
+
+        # Show Monte Carlo success probabilities for the user's risk profile
+        st.subheader(f"Chance of Reaching Each Goal on Time ({risk_profile} risk)")
+        for g, p in success_probs.items():
+            st.markdown(f"- **{g}**: {p:.0%}")
+
+        if goal_session.goals_df is not None:
+            goals_df = goal_session.goals_df
         st.session_state.show_allocate = False
 
     else:
@@ -419,17 +412,39 @@ if st.session_state.get("show_allocate", False):
 
 if st.session_state.get("show_progress", False):
     st.subheader("📊 Goal Progress")
-    fig, ax = plt.subplots(figsize=(8, 3))
-    names = goals_df["name"]
-    current = goals_df["current_amount"]
-    target = goals_df["target_amount"]
-    ax.barh(names, target, color="#e0e0e0", label="Target")
-    ax.barh(names, current, color="#4f8cff", label="Current")
-    ax.set_xlabel("Amount (₹)")
-    ax.legend()
-    st.pyplot(fig)
+    from modules import charts
+    with metrics.timed("chart_render"):
+        progress_png = charts.render_progress_bars(goals_df["name"], goals_df["current_amount"], goals_df["target_amount"])
+    st.image(progress_png)
     st.session_state.show_progress = False
 
+# --- Progress Analytics: rolling aggregates, updated only with entries since the last rerun ---
+st.markdown("<hr>", unsafe_allow_html=True)
+st.subheader("📈 Progress Analytics")
+from modules import progress
+with metrics.timed("progress_analytics"):
+    progress_summary = progress.summary(progress.update(username, ACTIVITY_LOG_DIR))
+profile_trend = progress_summary["profile"]
+if profile_trend["updates"]:
+    trend_cols = st.columns(3)
+    trend_cols[0].metric("Savings rate", f"{profile_trend['savings_rate']:.0%}" if profile_trend["savings_rate"] is not None else "—")
+    for col, label, key in ((trend_cols[1], "Income trend", "income_trend"), (trend_cols[2], "Expenses trend", "expenses_trend")):
+        col.metric(label, f"₹{profile_trend[key]:+,.0f}/month" if profile_trend[key] is not None else "—")
+if progress_summary["goals"]:
+    st.dataframe(pd.DataFrame([
+        {
+            "Goal": g["goal"],
+            "Contribution Rate (₹/month)": round(g["contribution_rate"], 2),
+            "Contributed (₹)": round(g["contributed"], 2),
+            "Projected Now (₹)": round(g["projected_amount"], 2),
+            "Actual (₹)": round(g["actual_amount"], 2),
+            "Ahead (+) / Behind (-) (₹)": round(g["ahead_by"], 2),
+        }
+        for g in progress_summary["goals"] if not g["completed"]
+    ]), use_container_width=True)
+if not profile_trend["updates"] and not progress_summary["goals"]:
+    st.info("No history yet: allocations, goal edits and profile updates will show up here.")
+
 st.markdown("---")
 st.caption("Academic prototype for AI/ML course. No real financial advice. See README for details.")
 
@@ -446,15 +461,13 @@ if not any("retirement" in g["name"].lower() for g in goals):
 # Suggest increasing savings if monthly savings is low
 if data_manager.compute_monthly_savings(income, expenses) < 1000:
     suggestions.append("Your monthly savings are low. Review your expenses or increase your income to achieve your goals faster.")
-# Suggest reviewing overdue goals
-from datetime import datetime
-for g in goals:
-    try:
-        deadline = pd.to_datetime(g["deadline"])
-        if deadline < datetime(2025, 9, 24) and g["name"] not in user_data.get("completed_goals", []):
-            suggestions.append(f"Goal '{g['name']}' is past its deadline. Consider updating or completing it.")
-    except Exception:
-        pass
+# Suggest reviewing overdue and soon-due goals
+# Real current date, the same one the reminder scheduler sends emails for
+for kind, goal_name, deadline in reminders.goal_reminders(user_data, as_of=date.today()):
+    if kind == reminders.OVERDUE:
+        suggestions.append(f"Goal '{goal_name}' is past its deadline. Consider updating or completing it.")
+    else:
+        suggestions.append(f"Goal '{goal_name}' is due on {deadline}. Check that it is on track.")
 if suggestions:
     for s in suggestions:
         st.info(s)
@@ -464,28 +477,45 @@ else:
 # --- Export/Download Reports ---
 st.markdown("<hr>", unsafe_allow_html=True)
 st.subheader("⬇️ Export/Download Reports")
-import io
-# Export goals
+compress_exports = st.checkbox("Compress exports (gzip)", key="compress_exports")
+export_ext = ".csv.gz" if compress_exports else ".csv"
+export_mime = "application/gzip" if compress_exports else "text/csv"
+# Exports are only built after a click, streamed chunk by chunk from disk
 if st.button("Download Goals as CSV"):
-    goals_df_export = pd.DataFrame(goals)
-    csv = goals_df_export.to_csv(index=False).encode('utf-8')
+    from modules import export
     st.download_button(
         label="Download Goals CSV",
-        data=csv,
-        file_name=f'{username}_goals.csv',
-        mime='text/csv',
+        data=export.spool(export.goals_csv_chunks(goals, compress_exports)),
+        file_name=f'{username}_goals{export_ext}',
+        mime=export_mime,
     )
-# Export activity log
-activity_log = get_user_activity(username, limit=1000)
 if st.button("Download Activity Log as CSV"):
-    if activity_log:
-        activity_df = pd.DataFrame(activity_log)
-        csv = activity_df.to_csv(index=False).encode('utf-8')
+    from modules import export
+    _, log_bytes = activity_log.log_version(username, ACTIVITY_LOG_DIR)
+    if log_bytes or activity_log.list_segments(username, ACTIVITY_LOG_DIR):
+        with metrics.timed("activity_export"):
+            activity_csv = export.spool(export.activity_csv_chunks(username, ACTIVITY_LOG_DIR, compress_exports))
         st.download_button(
             label="Download Activity Log CSV",
-            data=csv,
-            file_name=f'{username}_activity_log.csv',
-            mime='text/csv',
+            data=activity_csv,
+            file_name=f'{username}_activity_log{export_ext}',
+            mime=export_mime,
         )
     else:
-        st.info("No activity log to export.")
\ No newline at end of file
+        st.info("No activity log to export.")
+
+# --- Write-behind: persist this rerun's profile/goal edits in one write ---
+flush_goal_session(goal_session)
+
+# --- Performance instrumentation (opt-in) ---
+metrics.record("rerun_total", time.perf_counter() - rerun_started)
+metrics.maybe_dump()
+if show_perf_panel:
+    st.sidebar.subheader("⏱️ Stage Timings (ms)")
+    perf_summary = metrics.summary()
+    if not metrics.enabled:
+        st.sidebar.info("Timings are off; start the app with FINAI_METRICS=1 to record them.")
+    elif perf_summary:
+        st.sidebar.dataframe(pd.DataFrame(perf_summary).T.round(2), use_container_width=True)
+    else:
+        st.sidebar.info("No timings recorded yet.")
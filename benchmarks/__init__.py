@@ -0,0 +1 @@
+# This file marks the 'benchmarks' directory as a Python package.
\ No newline at end of file
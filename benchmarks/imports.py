@@ -0,0 +1,132 @@
+"""
+Import-time report for the modules package.
+
+- Imports each module in a fresh interpreter (python -X importtime) and
+  records the cumulative import time of that module, min/median over --repeat.
+- Lists which heavy dependencies (numpy, pandas, matplotlib, streamlit,
+  smtplib) each import pulled in.
+- Output uses the benchmarks.run JSON layout, so --compare works the same way.
+
+Expected: only the numerical engines (NUMERICAL: projection_engine,
+monte_carlo) load numpy/pandas at import; every other module loads none of
+numpy, pandas, matplotlib or streamlit and imports in tens of milliseconds
+(data_manager ~5 ms, planning_engine <1 ms, api ~60 ms; projection_engine
+~480 ms). A module outside NUMERICAL that pulls one of them in is reported
+and makes the run exit 1.
+
+Usage:
+    python -m benchmarks.imports --output imports.json
+    python -m benchmarks.imports --compare imports_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from benchmarks.run import compare
+
+MODULES = [
+    "modules.data_manager",
+    "modules.planning_engine",
+    "modules.goal_records",
+    "modules.explanation_engine",
+    "modules.storage",
+    "modules.activity_log",
+    "modules.cache",
+    "modules.metrics",
+    "modules.export",
+    "modules.notifications",
+    "modules.reminders",
+    "modules.goal_history",
+    "modules.api",
+    "modules.analytics",
+    "modules.progress",
+    "modules.batch",
+    "modules.projection_engine",
+    "modules.monte_carlo",
+    "modules.charts",
+]
+HEAVY = ("numpy", "pandas", "matplotlib", "streamlit", "smtplib")
+NUMERICAL = ("modules.projection_engine", "modules.monte_carlo")  # numpy at module level by design
+LAZY = ("numpy", "pandas", "matplotlib", "streamlit")  # must not load on import of anything else
+
+_PROBE = "import sys, {module}; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+def import_time(module, root):
+    """(cumulative seconds, heavy deps loaded) for importing module in a new interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, cwd=root, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1e6
+    return cumulative, result.stdout.split()
+
+
+def run(args):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for module in MODULES:
+        if args.only and not any(pattern in module for pattern in args.only):
+            continue
+        times, heavy = [], []
+        for _ in range(args.repeat):
+            seconds, heavy = import_time(module, root)
+            times.append(seconds)
+        results[module] = {
+            "min_s": min(times),
+            "median_s": statistics.median(times),
+            "repeat": args.repeat,
+            "peak_bytes": 0,
+            "loads": heavy,
+        }
+        print(f"{module:32s} min {results[module]['min_s'] * 1000:8.1f} ms   loads {', '.join(heavy) or '-'}",
+              file=sys.stderr)
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "params": {"repeat": args.repeat}},
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-module import time.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="measure only modules whose name contains one of these")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio vs baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    eager = {module: [dep for dep in result["loads"] if dep in LAZY]
+             for module, result in results["results"].items() if module not in NUMERICAL}
+    eager = {module: deps for module, deps in eager.items() if deps}
+    for module, deps in eager.items():
+        print(f"EAGER IMPORT: {module} loads {', '.join(deps)} at import", file=sys.stderr)
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+    if eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Load generator for the planning API (modules/api.py).
+
+- Opens --concurrency keep-alive connections and sends --requests requests
+  in total, cycling through payloads built from seeded synthetic profiles.
+- Reports throughput and p50/p90/p99/max latency per endpoint, plus the
+  server's coalescing counters, as JSON.
+- --spawn starts the server in a subprocess on a free local port first.
+
+Usage:
+    python -m benchmarks.load --spawn --endpoint plan --concurrency 64 --requests 20000
+    python -m benchmarks.load --port 8765 --endpoint mixed --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import synthetic
+
+ENDPOINTS = ("plan", "project", "explain")
+
+
+def build_payloads(endpoint, n_profiles, seed):
+    """Request bodies for one endpoint, from n_profiles synthetic profiles."""
+    payloads = []
+    for i, (_, profile) in enumerate(synthetic.generate_profiles(n_profiles, seed=seed)):
+        body = {"goals": profile["goals"], "income": profile["income"], "expenses": profile["expenses"]}
+        if endpoint == "plan":
+            body["mode"] = ("greedy", "weighted")[i % 2]
+        elif endpoint == "project":
+            body["horizon_months"] = 120
+        else:
+            body = {"reason_tags": [
+                {"goal": g["name"], "tag": ("HIGH_PRIORITY_UNDERFUNDED", "ON_TRACK", "STANDARD")[j % 3],
+                 "allocate": 100.0 * j, "months_left": 6 + j} for j, g in enumerate(profile["goals"])
+            ]}
+        payloads.append(json.dumps(body).encode("utf-8"))
+    return payloads
+
+
+async def _request(reader, writer, host, method, path, body=b""):
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, jobs, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while jobs:
+            endpoint, body = jobs.pop()
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, "POST", f"/{endpoint}", body)
+            latencies[endpoint].append(time.perf_counter() - start)
+            if status != 200:
+                errors[endpoint] += 1
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_load(host, port, endpoints, concurrency, total, n_profiles, seed):
+    payloads = {endpoint: build_payloads(endpoint, n_profiles, seed) for endpoint in endpoints}
+    jobs = [(endpoints[i % len(endpoints)], payloads[endpoints[i % len(endpoints)]][i // len(endpoints) % n_profiles])
+            for i in range(total)]
+    jobs.reverse()  # clients pop from the end
+    latencies = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, jobs, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for endpoint, values in latencies.items():
+        ordered = sorted(values)
+        results[f"api.{endpoint}"] = {
+            "requests": len(values),
+            "errors": errors[endpoint],
+            "throughput_rps": len(values) / elapsed,
+            "p50_ms": 1000 * _percentile(ordered, 0.50),
+            "p90_ms": 1000 * _percentile(ordered, 0.90),
+            "p99_ms": 1000 * _percentile(ordered, 0.99),
+            "max_ms": 1000 * ordered[-1],
+        }
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, health = await _request(reader, writer, host, "GET", "/health")
+    finally:
+        writer.close()
+    return {"elapsed_s": elapsed, "server": json.loads(health)}, results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port, extra_args=()):
+    """Start modules.api on localhost:port and wait until it accepts connections."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, "-m", "modules.api", "--port", str(port), *extra_args], cwd=root)
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("planning API exited during startup")
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("planning API did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the planning API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--spawn", action="store_true", help="start the server in a subprocess on a free port")
+    parser.add_argument("--endpoint", choices=ENDPOINTS + ("mixed",), default="plan")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=5000, help="total requests to send")
+    parser.add_argument("--profiles", type=int, default=500, help="distinct synthetic profiles to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window-ms", type=float, help="with --spawn: server coalescing window")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    endpoints = list(ENDPOINTS) if args.endpoint == "mixed" else [args.endpoint]
+    proc = None
+    if args.spawn:
+        args.host, args.port = "127.0.0.1", _free_port()
+        proc = spawn_server(args.port, ["--window-ms", str(args.window_ms)] if args.window_ms is not None else [])
+    try:
+        info, results = asyncio.run(run_load(args.host, args.port, endpoints, args.concurrency,
+                                             args.requests, args.profiles, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    for name, r in results.items():
+        print(f"{name:14s} {r['throughput_rps']:9.0f} req/s   p50 {r['p50_ms']:7.2f} ms   p99 {r['p99_ms']:7.2f} ms"
+              f"   errors {r['errors']}", file=sys.stderr)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "params": {k: v for k, v in vars(args).items() if k != "output"}, **info},
+        "results": results,
+    }
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Benchmark suite for the modules package hot paths.
+
+- get_goals_dataframe (per-user list and combined multi-user frame)
+- plan_allocations (per user), plan_records (pandas-free, per user) and
+  plan_allocations_batch
+- explain_allocations (per user) and explain_columns (whole batch)
+- activity log append, tail read and goal-filtered query
+- goal history as-of replay over a multi-year event stream
+- columnar analytics store aggregate scans across all users
+- incremental progress analytics: fold in new entries, then summarize
+
+Each case reports min/median wall time over --repeat runs plus peak traced
+memory (one extra run under tracemalloc), written as JSON. --compare checks
+the results against a saved baseline and exits non-zero on regressions.
+
+Usage:
+    python -m benchmarks.run --users 10000 --output bench.json
+    python -m benchmarks.run --compare bench_baseline.json --threshold 1.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from modules import activity_log, analytics, data_manager, explanation_engine, goal_history, goal_records, planning_engine, progress
+from benchmarks import synthetic
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+# Each case is a setup function returning the zero-argument callable to time.
+
+@case("get_goals_dataframe.per_user")
+def _goals_per_user(ctx):
+    goal_lists = ctx["goal_lists"]
+    return lambda: [data_manager.get_goals_dataframe(goals) for goals in goal_lists]
+
+
+@case("get_goals_dataframe.combined")
+def _goals_combined(ctx):
+    return lambda: data_manager.get_goals_dataframe(ctx["goals_frame"])
+
+
+@case("plan_allocations.per_user")
+def _plan_per_user(ctx):
+    frames = [data_manager.get_goals_dataframe(goals) for goals in ctx["goal_lists"]]
+    savings = ctx["savings"]
+    return lambda: [planning_engine.plan_allocations(df, savings.iloc[i]) for i, df in enumerate(frames)]
+
+
+@case("plan_records.per_user")
+def _plan_records_per_user(ctx):
+    goal_lists = ctx["goal_lists"]
+    savings = ctx["savings"]
+    return lambda: [goal_records.plan_records(goal_records.build_records(goals), savings.iloc[i])
+                    for i, goals in enumerate(goal_lists)]
+
+
+@case("plan_allocations_batch")
+def _plan_batch(ctx):
+    goals_df = data_manager.get_goals_dataframe(ctx["goals_frame"])
+    return lambda: planning_engine.plan_allocations_batch(goals_df, ctx["savings"])
+
+
+@case("explain_allocations")
+def _explain(ctx):
+    frames = [data_manager.get_goals_dataframe(goals) for goals in ctx["goal_lists"]]
+    tags = [planning_engine.plan_allocations(df, ctx["savings"].iloc[i])[1] for i, df in enumerate(frames)]
+    return lambda: [explanation_engine.explain_allocations(t) for t in tags]
+
+
+@case("explain_columns.batch")
+def _explain_columns(ctx):
+    plan = planning_engine.plan_allocations_batch(data_manager.get_goals_dataframe(ctx["goals_frame"]), ctx["savings"])
+    columns = (plan["name"], plan["tag"], plan["allocate"].to_numpy(), plan["months_left"].to_numpy())
+    return lambda: explanation_engine.explain_columns(*columns)
+
+
+@case("activity_log.append")
+def _log_append(ctx):
+    log_dir = ctx["log_dir"]
+    return lambda: [activity_log.log_user_activity("bench_append", "Updated goal", "Vacation", log_dir=log_dir)
+                    for _ in range(ctx["appends"])]
+
+
+@case("activity_log.tail_read")
+def _log_tail(ctx):
+    log_dir = ctx["log_dir"]
+    return lambda: [activity_log.get_user_activity("bench_reader", limit, log_dir=log_dir) for limit in (10, 30, 1000)]
+
+
+@case("activity_log.goal_query")
+def _log_goal_query(ctx):
+    log_dir = ctx["log_dir"]
+    activity_log.rebuild_postings("bench_reader", log_dir)
+    return lambda: [activity_log.query_activity("bench_reader", goal=goal, page=page, page_size=10, log_dir=log_dir)
+                    for goal in synthetic.GOAL_NAMES[:4] for page in (0, 5)]
+
+
+@case("goal_history.as_of")
+def _history_as_of(ctx):
+    log_dir = ctx["log_dir"]
+    goals = [{"name": name, "target_amount": 10000.0, "current_amount": 0.0, "deadline": "2030-01-01", "priority": 3}
+             for name in synthetic.GOAL_NAMES[:4]]
+    # Three years of allocations, written in per-session batches
+    start, events = datetime(2022, 1, 1), []
+    for i in range(ctx["history_events"]):
+        events.append(goal_history.make_event("allocation", goals[i % 4]["name"], i % 4,
+                                               {"current_amount": float(i), "amount": 1.0},
+                                               start + timedelta(hours=6 * i)))
+    for i in range(0, len(events), 20):
+        goal_history.append_events("bench_history", events[i:i + 20], {"goals": goals, "completed_goals": []},
+                                   history_dir=log_dir)
+    dates = [start + timedelta(days=d) for d in range(0, 6 * ctx["history_events"] // 24, 30)]
+    return lambda: [goal_history.goals_as_of("bench_history", when, history_dir=log_dir) for when in dates]
+
+
+@case("progress.update")
+def _progress_update(ctx):
+    # Years of activity already folded in; each run adds a few entries and re-summarizes
+    log_dir = ctx["log_dir"]
+    progress.update("bench_reader", log_dir, log_dir, log_dir)
+    entry = {"action": "Updated profile", "details": "Income: ₹5000.0, Expenses: ₹3000.0, Risk: Medium, Email: -"}
+
+    def run():
+        for _ in range(10):
+            activity_log.log_user_activity("bench_reader", entry["action"], entry["details"], log_dir=log_dir)
+            progress.summary(progress.update("bench_reader", log_dir, log_dir, log_dir))
+    return run
+
+
+@case("analytics.aggregate")
+def _analytics_aggregate(ctx):
+    from modules.storage import open_store
+    store = open_store(f"json:{os.path.join(ctx['log_dir'], 'profiles')}")
+    store.save_many(synthetic.generate_profiles(ctx["analytics_users"], seed=ctx["seed"]))
+    columns = analytics.ColumnStore(os.path.join(ctx["log_dir"], "analytics"))
+    columns.refresh(store, log_dir=os.path.join(ctx["log_dir"], "profiles"))
+
+    def scan():
+        months_left, required = columns.goal_metrics()
+        columns.aggregate("goals", "priority", "target_amount", "mean")
+        return columns.aggregate("goals", "goal", where=required > 0)
+    return scan
+
+
+def build_context(args, log_dir):
+    goals_frame, savings = synthetic.generate_goals_frame(args.users, (args.min_goals, args.max_goals), args.seed)
+    # Per-user paths run on a sample so large --users stays tractable
+    sample_users = list(savings.index[:args.per_user_sample])
+    sample = goals_frame[goals_frame["user_id"].isin(sample_users)]
+    goal_lists = [rows.drop(columns="user_id").to_dict(orient="records") for _, rows in sample.groupby("user_id", sort=False)]
+    synthetic.generate_activity_log("bench_reader", args.log_entries, log_dir, seed=args.seed)
+    return {
+        "goals_frame": goals_frame,
+        "savings": savings,
+        "goal_lists": goal_lists,
+        "log_dir": log_dir,
+        "appends": args.appends,
+        "history_events": args.history_events,
+        "analytics_users": args.analytics_users,
+        "seed": args.seed,
+    }
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "repeat": repeat,
+        "peak_bytes": peak,
+    }
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as log_dir:
+        ctx = build_context(args, log_dir)
+        results = {}
+        for name, setup in CASES.items():
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            results[name] = measure(setup(ctx), args.repeat)
+            print(f"{name:32s} min {results[name]['min_s'] * 1000:10.2f} ms   "
+                  f"peak {results[name]['peak_bytes'] / 2**20:8.2f} MiB", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "only")},
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print time/memory ratios vs baseline; return the names of regressed cases."""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:32s} (new case)")
+            continue
+        time_ratio = result["min_s"] / base["min_s"] if base["min_s"] else float("inf")
+        mem_ratio = result["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0
+        flag = ""
+        if time_ratio > threshold or mem_ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:32s} time x{time_ratio:6.2f}   memory x{mem_ratio:6.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the planning hot paths.")
+    parser.add_argument("--users", type=int, default=10000, help="users in the combined frame (1 to 1M)")
+    parser.add_argument("--min-goals", type=int, default=3)
+    parser.add_argument("--max-goals", type=int, default=10)
+    parser.add_argument("--per-user-sample", type=int, default=200, help="users used by the per-user cases")
+    parser.add_argument("--log-entries", type=int, default=20000, help="records in the benchmark activity log")
+    parser.add_argument("--appends", type=int, default=200, help="activity appends per timed run")
+    parser.add_argument("--analytics-users", type=int, default=20000, help="JSON profiles written for the analytics scan")
+    parser.add_argument("--history-events", type=int, default=4380, help="goal events in the as-of replay history")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown/memory ratio vs baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Seeded synthetic data for benchmarks.
+
+- generate_goals_frame: combined multi-user goals frame, built column-wise
+  with NumPy so 1M users fit in seconds.
+- generate_profiles: per-user profile dicts in the stored JSON shape.
+- generate_activity_log: a user's JSONL activity log of any length.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules import activity_log, data_manager
+
+GOAL_NAMES = [
+    "Emergency Fund", "Vacation", "House Down Payment", "Retirement", "Car",
+    "Education", "Wedding", "Home Loan", "Gadgets", "Medical Reserve",
+    "Business Startup", "Travel Abroad",
+]
+ACTIONS = ["Updated profile", "Added new goal", "Updated goal", "Completed goal"]
+
+
+def generate_goals_frame(n_users, goals_per_user=(3, 10), seed=0, as_of=None):
+    """
+    Goals for n_users users as one DataFrame with a user_id column.
+    goals_per_user is an inclusive (min, max) range, capped at len(GOAL_NAMES).
+    Returns (goals_df, monthly_savings Series indexed by user_id).
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = goals_per_user
+    hi = min(hi, len(GOAL_NAMES))
+    counts = rng.integers(lo, hi + 1, size=n_users)
+    n_goals = int(counts.sum())
+    user_idx = np.repeat(np.arange(n_users), counts)
+    # Position of each goal within its user, used to pick distinct names
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    position = np.arange(n_goals) - starts
+    name_offset = np.repeat(rng.integers(0, len(GOAL_NAMES), size=n_users), counts)
+
+    as_of = pd.Timestamp(as_of if as_of is not None else data_manager.TODAY)
+    target = rng.choice([3000.0, 6000.0, 20000.0, 100000.0], size=n_goals) * rng.uniform(0.5, 2.0, size=n_goals)
+    goals_df = pd.DataFrame({
+        "user_id": np.char.add("user", user_idx.astype(str)),
+        "name": np.asarray(GOAL_NAMES, dtype=object)[(name_offset + position) % len(GOAL_NAMES)],
+        "target_amount": target.round(2),
+        "current_amount": (target * rng.uniform(0, 1.1, size=n_goals)).round(2),
+        "deadline": as_of.normalize() + pd.to_timedelta(rng.integers(-60, 7300, size=n_goals), unit="D"),
+        "priority": rng.integers(1, 6, size=n_goals),
+    })
+    savings = pd.Series(
+        rng.choice([500.0, 1500.0, 2000.0, 4000.0, 10000.0], size=n_users),
+        index=np.char.add("user", np.arange(n_users).astype(str)),
+    )
+    return goals_df, savings
+
+
+def generate_profiles(n_users, goals_per_user=(3, 10), seed=0):
+    """Yield (username, profile dict) pairs shaped like data/<user>_user.json."""
+    goals_df, savings = generate_goals_frame(n_users, goals_per_user, seed)
+    goals_df["deadline"] = goals_df["deadline"].dt.strftime("%Y-%m-%d")
+    columns = ["name", "target_amount", "current_amount", "deadline", "priority"]
+    risk = np.random.default_rng(seed + 1).choice(["Low", "Medium", "High"], size=n_users)
+    for i, (username, rows) in enumerate(goals_df.groupby("user_id", sort=False)):
+        expenses = 3000.0
+        yield username, {
+            "income": float(savings[username] + expenses),
+            "expenses": expenses,
+            "risk_profile": str(risk[i]),
+            "goals": rows[columns].to_dict(orient="records"),
+        }
+
+
+def generate_activity_log(username, n_entries, log_dir, seed=0, goal_names=GOAL_NAMES):
+    """Write n_entries synthetic activity records for username (oldest first)."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-01-01")
+    stamps = start + pd.to_timedelta(np.sort(rng.integers(0, 3 * 365 * 86400, size=n_entries)), unit="s")
+    actions = rng.integers(0, len(ACTIONS), size=n_entries)
+    goals = rng.integers(0, len(goal_names), size=n_entries)
+    entries = (
+        {"timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"), "action": ACTIONS[a], "details": goal_names[g]}
+        for ts, a, g in zip(stamps, actions, goals)
+    )
+    activity_log.append_entries(username, entries, log_dir)
@@ -0,0 +1,585 @@
+"""
+Module 4: Activity Log
+
+- Append-only, one-JSON-record-per-line activity log per user.
+- A sidecar offset index (8-byte little-endian record offsets) makes appends
+  O(1) and lets recent-activity reads touch only the tail of the file.
+- Inverted index from goal name / action type to record offsets (one posting
+  file of offsets per key), kept up to date on every append, backing a
+  paginated query API filtered by goal, action and time range.
+- Chunked oldest-first iteration over the whole log for streaming exports.
+- Monthly segmentation: the plain log only holds the current month; older
+  records are rotated into gzip-compressed per-month archive segments and
+  dropped after RETENTION_MONTHS, so the hot files stay small.
+- One-shot migrator for the legacy newest-first ``*_activity.json`` arrays.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import itertools
+import shutil
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+LOG_DIR = "data"
+LOG_SUFFIX = "_activity.jsonl"
+INDEX_SUFFIX = "_activity.idx"
+LEGACY_SUFFIX = "_activity.json"
+POSTINGS_SUFFIX = "_activity_postings"
+ARCHIVE_SUFFIX = "_activity_archive"
+SEGMENT_SUFFIX = ".jsonl.gz"
+RETENTION_MONTHS = int(os.environ.get("FINAI_LOG_RETENTION_MONTHS", "24"))  # 0 keeps archives forever
+
+# Actions whose details start with the goal name (older entries have no "goal" field)
+GOAL_ACTIONS = {"Added new goal", "Updated goal", "Completed goal", "Home Loan goal added", "Home Loan goal updated"}
+
+_OFFSET = struct.Struct("<Q")
+_path_locks = {}  # absolute index path -> thread lock; users never wait on each other
+_path_locks_lock = threading.Lock()
+_active_month = {}  # log path -> month of its oldest record, to skip the rotation check
+
+
+def get_log_path(username, log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, f"{username}{LOG_SUFFIX}")
+
+
+def get_index_path(username, log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, f"{username}{INDEX_SUFFIX}")
+
+
+def get_legacy_path(username, log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, f"{username}{LEGACY_SUFFIX}")
+
+
+def get_postings_dir(username, log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, f"{username}{POSTINGS_SUFFIX}")
+
+
+def get_archive_dir(username, log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, f"{username}{ARCHIVE_SUFFIX}")
+
+
+def _posting_path(postings_dir, kind, value):
+    """One posting file per (kind, value); goal names match case-insensitively."""
+    key = f"{kind}:{value.strip().lower() if kind == 'goal' else value}"
+    return os.path.join(postings_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".idx")
+
+
+def entry_goal(entry):
+    """Goal an entry refers to: its "goal" field, else parsed from goal-action details."""
+    if entry.get("goal"):
+        return entry["goal"]
+    if entry.get("action") in GOAL_ACTIONS and entry.get("details"):
+        return entry["details"].split(" (")[0].strip()
+    return None
+
+
+@contextmanager
+def _locked(idx_path):
+    """Serialize writers across threads and (where supported) processes."""
+    os.makedirs(os.path.dirname(idx_path) or ".", exist_ok=True)
+    key = os.path.abspath(idx_path)
+    with _path_locks_lock:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.Lock()
+    with lock:
+        with open(idx_path, "ab") as idx:
+            if fcntl is not None:
+                fcntl.flock(idx.fileno(), fcntl.LOCK_EX)
+            try:
+                yield idx
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(idx.fileno(), fcntl.LOCK_UN)
+
+
+def _encode(entry):
+    return (json.dumps(entry) + "\n").encode("utf-8")
+
+
+def _append_postings(postings_dir, entries_with_offsets):
+    """Append each entry's offset to its goal and action posting files."""
+    if not os.path.isdir(postings_dir):
+        return  # not built yet; built from the log on first query
+    grouped = {}
+    for entry, offset in entries_with_offsets:
+        keys = [("action", entry.get("action") or "")]
+        goal = entry_goal(entry)
+        if goal:
+            keys.append(("goal", goal))
+        for kind, value in keys:
+            grouped.setdefault(_posting_path(postings_dir, kind, value), []).append(_OFFSET.pack(offset))
+    for path, packed in grouped.items():
+        with open(path, "ab") as f:
+            f.write(b"".join(packed))
+
+
+def _append_records(log_path, idx, entries, postings_dir=None):
+    """Append encoded entries to the log, their offsets to the open index and postings."""
+    written = []
+    with open(log_path, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        packed = []
+        for entry in entries:
+            line = _encode(entry)
+            f.write(line)
+            packed.append(_OFFSET.pack(offset))
+            written.append((entry, offset))
+            offset += len(line)
+    idx.write(b"".join(packed))
+    if postings_dir:
+        _append_postings(postings_dir, written)
+
+
+def log_user_activity(username, action, details=None, log_dir=None, goal=None):
+    """Append one activity entry (optionally tagged with the goal it concerns) in O(1) and return it."""
+    migrate_legacy_log(username, log_dir)
+    entry = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "action": action,
+        "details": details or ""
+    }
+    if goal:
+        entry["goal"] = goal
+    append_entries(username, [entry], log_dir)
+    return entry
+
+
+def append_entries(username, entries, log_dir=None):
+    """Bulk-append already-built entries (oldest first) under one lock."""
+    _maybe_rotate(username, log_dir)
+    with _locked(get_index_path(username, log_dir)) as idx:
+        _append_records(get_log_path(username, log_dir), idx, entries, get_postings_dir(username, log_dir))
+
+
+def log_version(username, log_dir=None):
+    """
+    Cheap change marker for caches: (inode, size in bytes) of the active log,
+    (0, 0) if absent. The inode changes when rotate_log rewrites the file, so
+    a rotated log never repeats an earlier version even at the same size.
+    """
+    try:
+        st = os.stat(get_log_path(username, log_dir))
+    except OSError:
+        return 0, 0
+    return st.st_ino, st.st_size
+
+
+def rebuild_index(username, log_dir=None):
+    """Rescan the log and rewrite its offset index. Returns the record count."""
+    log_path = get_log_path(username, log_dir)
+    idx_path = get_index_path(username, log_dir)
+    offsets = []
+    if os.path.exists(log_path):
+        with open(log_path, "rb") as f:
+            pos = 0
+            for line in f:
+                if line.strip():
+                    offsets.append(_OFFSET.pack(pos))
+                pos += len(line)
+    with _locked(idx_path):
+        with open(idx_path, "wb") as idx:
+            idx.write(b"".join(offsets))
+    return len(offsets)
+
+
+def rebuild_postings(username, log_dir=None, if_missing=False):
+    """
+    Rescan the log and rebuild all goal/action posting files. Returns the number
+    of keys. With if_missing, a postings dir another caller finished first is kept.
+    """
+    log_path = get_log_path(username, log_dir)
+    postings_dir = get_postings_dir(username, log_dir)
+    with _locked(get_index_path(username, log_dir)):
+        if if_missing and os.path.isdir(postings_dir):
+            return len(os.listdir(postings_dir))
+        # Unique per rebuild, so a crashed or concurrent rebuild can't collide with this one
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(postings_dir) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(postings_dir) or ".")
+        try:
+            entries = []
+            if os.path.exists(log_path):
+                with open(log_path, "rb") as f:
+                    pos = 0
+                    for line in f:
+                        try:
+                            entries.append((json.loads(line), pos))
+                        except ValueError:
+                            pass
+                        pos += len(line)
+            _append_postings(tmp_dir, entries)
+            shutil.rmtree(postings_dir, ignore_errors=True)
+            os.replace(tmp_dir, postings_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return len(os.listdir(postings_dir))
+
+
+def _shift_month(month, delta):
+    """"YYYY-MM" moved by delta months."""
+    year, mon = month.split("-")
+    index = int(year) * 12 + int(mon) - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _segment_path(archive_dir, month):
+    return os.path.join(archive_dir, month + SEGMENT_SUFFIX)
+
+
+def list_segments(username, log_dir=None):
+    """Archived months ("YYYY-MM") for the user, oldest first."""
+    archive_dir = get_archive_dir(username, log_dir)
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(f[:-len(SEGMENT_SUFFIX)] for f in os.listdir(archive_dir) if f.endswith(SEGMENT_SUFFIX))
+
+
+def read_segment(username, month, log_dir=None):
+    """All entries of one archived month, oldest first."""
+    try:
+        with gzip.open(_segment_path(get_archive_dir(username, log_dir), month), "rb") as f:
+            return decode_lines(f.read())
+    except (OSError, EOFError):
+        return []
+
+
+def _first_month(log_path):
+    """Month of the oldest record in the active log, or None if it is empty."""
+    try:
+        with open(log_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    return json.loads(line).get("timestamp", "")[:7]
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _maybe_rotate(username, log_dir=None):
+    """Rotate before appending once the active log holds records from an earlier month."""
+    log_path = get_log_path(username, log_dir)
+    current = datetime.now().strftime("%Y-%m")
+    month = _active_month.get(log_path)
+    if month is None:
+        month = _active_month[log_path] = _first_month(log_path) or current
+    if month < current:
+        rotate_log(username, log_dir)
+
+
+def rotate_log(username, log_dir=None, retention_months=None, now=None):
+    """
+    Move records from before the current month into gzip-compressed monthly
+    archive segments, rewrite the active log (and its index) with the rest,
+    and delete segments older than retention_months (default RETENTION_MONTHS,
+    0 keeps everything). Returns the number of records archived.
+    """
+    current = (now or datetime.now()).strftime("%Y-%m")
+    retention = RETENTION_MONTHS if retention_months is None else retention_months
+    log_path = get_log_path(username, log_dir)
+    archive_dir = get_archive_dir(username, log_dir)
+    archived = 0
+    with _locked(get_index_path(username, log_dir)) as idx:
+        by_month, keep = {}, []
+        if os.path.exists(log_path):
+            with open(log_path, "rb") as f:
+                for line in f:
+                    try:
+                        month = json.loads(line).get("timestamp", "")[:7]
+                    except ValueError:
+                        continue  # blank line or torn write
+                    line = line if line.endswith(b"\n") else line + b"\n"
+                    if month and month < current:
+                        by_month.setdefault(month, []).append(line)
+                    else:
+                        keep.append(line)
+        if by_month:
+            os.makedirs(archive_dir, exist_ok=True)
+            for month, lines in by_month.items():
+                # Appends a gzip member; segments are normally written once
+                with gzip.open(_segment_path(archive_dir, month), "ab") as segment:
+                    segment.writelines(lines)
+                archived += len(lines)
+            tmp = f"{log_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.writelines(keep)
+            os.replace(tmp, log_path)
+            # Rewrite the index in place: waiting writers hold locks on this file
+            offsets, pos = [], 0
+            for line in keep:
+                offsets.append(_OFFSET.pack(pos))
+                pos += len(line)
+            idx.truncate(0)
+            idx.write(b"".join(offsets))
+            idx.flush()
+            shutil.rmtree(get_postings_dir(username, log_dir), ignore_errors=True)  # rebuilt on next query
+        if retention:
+            cutoff = _shift_month(current, -retention)
+            for month in list_segments(username, log_dir):
+                if month < cutoff:
+                    os.remove(_segment_path(archive_dir, month))
+    _active_month[log_path] = current
+    return archived
+
+
+def rotate_all_logs(log_dir=None, retention_months=None):
+    """Rotate every user's active log in ``log_dir``. Returns {username: archived count}."""
+    log_dir = log_dir or LOG_DIR
+    rotated = {}
+    if not os.path.isdir(log_dir):
+        return rotated
+    for fname in sorted(os.listdir(log_dir)):
+        if fname.endswith(LOG_SUFFIX):
+            username = fname[:-len(LOG_SUFFIX)]
+            rotated[username] = rotate_log(username, log_dir, retention_months)
+    return rotated
+
+
+def _tail_start(idx_path, limit, log_size):
+    """Byte offset of the oldest of the last ``limit`` records, or None if the index is unusable."""
+    if not os.path.exists(idx_path):
+        return None
+    idx_size = os.path.getsize(idx_path) // _OFFSET.size * _OFFSET.size
+    if idx_size == 0:
+        return None if log_size else 0
+    if limit is None:
+        return 0
+    pos = max(0, idx_size - limit * _OFFSET.size)
+    with open(idx_path, "rb") as idx:
+        idx.seek(pos)
+        start = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+        idx.seek(idx_size - _OFFSET.size)
+        last = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+    if last >= log_size:
+        return None
+    return start
+
+
+def decode_lines(chunk):
+    """Entries in a chunk of complete JSONL lines; blank and torn lines are skipped."""
+    records = []
+    for line in chunk.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue  # torn write from a crashed appender
+    return records
+
+
+def get_user_activity(username, limit=10, log_dir=None):
+    """
+    Return the last ``limit`` entries, newest first (``limit=None`` for all).
+    Only the tail of the active log after the indexed start offset is read,
+    plus as many archived months as needed to fill ``limit``.
+    """
+    migrate_legacy_log(username, log_dir)
+    if limit == 0:
+        return []
+    records = []
+    log_path = get_log_path(username, log_dir)
+    if os.path.exists(log_path):
+        log_size = os.path.getsize(log_path)
+        idx_path = get_index_path(username, log_dir)
+        start = _tail_start(idx_path, limit, log_size)
+        if start is None:
+            rebuild_index(username, log_dir)
+            start = _tail_start(idx_path, limit, log_size) or 0
+        with open(log_path, "rb") as f:
+            f.seek(start)
+            records = decode_lines(f.read())
+        records.reverse()
+    # Fall back to archived months, newest first, only while short of limit
+    for month in reversed(list_segments(username, log_dir)):
+        if limit is not None and len(records) >= limit:
+            break
+        records.extend(reversed(read_segment(username, month, log_dir)))
+    return records if limit is None else records[:limit]
+
+
+def iter_user_activity(username, log_dir=None, chunk_bytes=1 << 20):
+    """
+    Yield every entry oldest first: archived months one at a time, then the
+    active log in chunk_bytes pieces. Stops at the active log size seen when
+    it is opened, so concurrent appends are not mixed in.
+    """
+    migrate_legacy_log(username, log_dir)
+    for month in list_segments(username, log_dir):
+        yield from read_segment(username, month, log_dir)
+    log_path = get_log_path(username, log_dir)
+    if not os.path.exists(log_path):
+        return
+    with open(log_path, "rb") as f:
+        remaining = os.fstat(f.fileno()).st_size
+        carry = b""
+        while remaining > 0:
+            chunk = f.read(min(chunk_bytes, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            chunk = carry + chunk
+            cut = chunk.rfind(b"\n") + 1
+            carry = chunk[cut:]
+            yield from decode_lines(chunk[:cut])
+        if carry:
+            yield from decode_lines(carry)
+
+
+def migrate_legacy_log(username, log_dir=None):
+    """
+    Convert ``<user>_activity.json`` (newest-first array) into the JSONL format.
+    The legacy file is renamed to ``.json.bak`` so the migration runs once.
+    Returns the number of migrated entries.
+    """
+    legacy_path = get_legacy_path(username, log_dir)
+    if not os.path.exists(legacy_path):
+        return 0
+    try:
+        with open(legacy_path, "r") as f:
+            legacy = json.load(f)
+    except Exception:
+        legacy = []
+    with _locked(get_index_path(username, log_dir)) as idx:
+        if not os.path.exists(legacy_path):
+            return 0  # another session migrated while we waited
+        _append_records(get_log_path(username, log_dir), idx, reversed(legacy), get_postings_dir(username, log_dir))
+        os.replace(legacy_path, legacy_path + ".bak")
+    return len(legacy)
+
+
+def migrate_all_legacy_logs(log_dir=None):
+    """Migrate every legacy activity file in ``log_dir``. Returns {username: count}."""
+    log_dir = log_dir or LOG_DIR
+    migrated = {}
+    if not os.path.isdir(log_dir):
+        return migrated
+    for fname in sorted(os.listdir(log_dir)):
+        if fname.endswith(LEGACY_SUFFIX):
+            username = fname[:-len(LEGACY_SUFFIX)]
+            migrated[username] = migrate_legacy_log(username, log_dir)
+    return migrated
+
+
+def _read_record(f, offset):
+    f.seek(offset)
+    try:
+        return json.loads(f.readline())
+    except ValueError:
+        return None
+
+
+def _timestamp_bound(f, offsets, count, stamp, right):
+    """Binary search over chronologically ordered offsets by record timestamp."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        record = _read_record(f, offsets(mid)) or {}
+        ts = record.get("timestamp", "")
+        if ts < stamp or (right and ts == stamp):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _format_stamp(value, end_of_day=False):
+    """Timestamp string for comparisons; bare dates cover the whole day."""
+    if not isinstance(value, str):
+        value = value.strftime("%Y-%m-%d %H:%M:%S" if isinstance(value, datetime) else "%Y-%m-%d")
+    if len(value) == 10:
+        value += " 23:59:59" if end_of_day else " 00:00:00"
+    return value
+
+
+def _active_matches(username, goal, action, start, end, log_dir):
+    """Matching records of the active log, newest first, read through the posting files."""
+    log_path = get_log_path(username, log_dir)
+    if not os.path.exists(log_path):
+        return
+    postings_dir = get_postings_dir(username, log_dir)
+    if not os.path.isdir(postings_dir):
+        rebuild_postings(username, log_dir, if_missing=True)
+
+    if goal:
+        posting = _posting_path(postings_dir, "goal", goal)
+    elif action:
+        posting = _posting_path(postings_dir, "action", action)
+    else:
+        posting = get_index_path(username, log_dir)
+    if not os.path.exists(posting):
+        return
+
+    with open(posting, "rb") as p, open(log_path, "rb") as f:
+        count = os.path.getsize(posting) // _OFFSET.size
+
+        def offsets(i):
+            p.seek(i * _OFFSET.size)
+            return _OFFSET.unpack(p.read(_OFFSET.size))[0]
+
+        lo = _timestamp_bound(f, offsets, count, start, False) if start else 0
+        hi = _timestamp_bound(f, offsets, count, end, True) if end else count
+        for i in range(hi - 1, lo - 1, -1):
+            record = _read_record(f, offsets(i))
+            if record is None or (action and record.get("action") != action):
+                continue
+            yield record
+
+
+def _archive_matches(username, goal, action, start, end, log_dir):
+    """Matching records of archived months, newest first; months outside [start, end] are not opened."""
+    goal_key = goal.strip().lower() if goal else None
+    for month in reversed(list_segments(username, log_dir)):
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        for record in reversed(read_segment(username, month, log_dir)):
+            ts = record.get("timestamp", "")
+            if (start and ts < start) or (end and ts > end):
+                continue
+            if action and record.get("action") != action:
+                continue
+            if goal_key and (entry_goal(record) or "").strip().lower() != goal_key:
+                continue
+            yield record
+
+
+def query_activity(username, goal=None, action=None, start=None, end=None,
+                   page=0, page_size=20, log_dir=None):
+    """
+    Paginated, newest-first activity filtered by goal (case-insensitive),
+    action type and time range (inclusive; datetimes or "YYYY-MM-DD HH:MM:SS").
+    In the active log only the posting file of the narrowest key and the
+    matching records are read, with the time range located by binary search;
+    archived months are opened only once the active log runs out of matches.
+    Returns (entries, has_more).
+    """
+    migrate_legacy_log(username, log_dir)
+    start = _format_stamp(start) if start else None
+    end = _format_stamp(end, end_of_day=True) if end else None
+    matches = itertools.chain(
+        _active_matches(username, goal, action, start, end, log_dir),
+        _archive_matches(username, goal, action, start, end, log_dir),
+    )
+    skip = page * page_size
+    results = list(itertools.islice(matches, skip, skip + page_size + 1))
+    return results[:page_size], len(results) > page_size
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["rotate"]:  # e.g. from a monthly cron job
+        for user, count in rotate_all_logs().items():
+            print(f"{user}: archived {count} entries")
+    else:
+        for user, count in migrate_all_legacy_logs().items():
+            print(f"{user}: migrated {count} entries")
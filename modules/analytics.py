@@ -0,0 +1,428 @@
+"""
+Module 18: Columnar Analytics Store
+
+- Copies every profile, goal and activity event into fixed-width column
+  files under data/analytics/ (one raw NumPy array per column), so
+  cross-user questions scan a few memory-mapped columns instead of parsing
+  every profile and log.
+- Text columns (user, goal name, action, risk profile) are dictionary-encoded
+  as int32 codes; the dictionaries live in manifest.json with row counts
+  and the source versions each user was ingested at.
+- refresh() is incremental: profiles are re-read only for users whose store
+  version changed, activity logs only from the byte offset already ingested
+  (a user is re-read in full after a log rotation). Activity logs are only
+  read: legacy .json logs are skipped unless refresh --migrate-legacy
+  converts them first.
+- scan() / aggregate() / goal_metrics() are the query helpers.
+
+Usage:
+    python -m modules.analytics refresh [--migrate-legacy]
+    python -m modules.analytics report
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+from modules import activity_log, data_manager
+from modules.storage import open_store
+
+ANALYTICS_DIR = os.path.join("data", "analytics")
+MANIFEST_NAME = "manifest.json"
+
+TABLES = {
+    "profiles": {"user": "<i4", "income": "<f8", "expenses": "<f8", "monthly_savings": "<f8",
+                 "risk_profile": "<i4", "goal_count": "<i4"},
+    "goals": {"user": "<i4", "goal": "<i4", "target_amount": "<f8", "current_amount": "<f8",
+              "deadline": "<M8[D]", "priority": "<i2", "completed": "|b1"},
+    "activity": {"user": "<i4", "timestamp": "<M8[s]", "action": "<i4", "goal": "<i4"},
+}
+# Dictionary-encoded columns and the dictionary each one uses (-1 = missing)
+ENCODED = {"user": "user", "goal": "goal", "action": "action", "risk_profile": "risk_profile"}
+AGGREGATIONS = ("count", "sum", "mean", "nunique")
+
+_thread_lock = threading.Lock()
+
+
+def _empty_manifest():
+    return {
+        "dictionaries": {name: [] for name in sorted(set(ENCODED.values()))},
+        "tables": {name: {"generation": 0, "rows": 0} for name in TABLES},
+        "sources": {"profiles": {}, "activity": {}},
+    }
+
+
+class ColumnStore:
+    """Column files plus manifest in one directory; reads are memory-mapped."""
+
+    def __init__(self, path=ANALYTICS_DIR):
+        self.path = path
+        self.manifest = self._load_manifest()
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.manifest["dictionaries"].items()}
+
+    # --- manifest and dictionaries ---
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return _empty_manifest()
+
+    def _save_manifest(self):
+        path = os.path.join(self.path, MANIFEST_NAME)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, path)
+
+    def encode(self, dictionary, value):
+        """Code for value, adding it to the dictionary if new (None -> -1)."""
+        if value is None:
+            return -1
+        codes = self._codes[dictionary]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.manifest["dictionaries"][dictionary].append(value)
+        return code
+
+    def code(self, dictionary, value):
+        """Existing code for value, -1 if it never occurs (for filters)."""
+        return self._codes[dictionary].get(value, -1)
+
+    def decode(self, dictionary, codes):
+        """Array of the values behind codes (None for -1)."""
+        import numpy as np
+        values = np.array(self.manifest["dictionaries"][dictionary] + [None], dtype=object)
+        return values[np.asarray(codes)]  # -1 picks the trailing None
+
+    # --- column files ---
+
+    def rows(self, table):
+        return self.manifest["tables"][table]["rows"]
+
+    def _column_path(self, table, column, generation=None):
+        if generation is None:
+            generation = self.manifest["tables"][table]["generation"]
+        return os.path.join(self.path, f"{table}.{column}.{generation}.bin")
+
+    def column(self, table, name):
+        """Read-only memory map of one column (no rows are copied)."""
+        import numpy as np
+        dtype = np.dtype(TABLES[table][name])
+        rows = self.rows(table)
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(table, name), dtype=dtype, mode="r", shape=(rows,))
+
+    def _append(self, table, columns):
+        """Append rows to the current column files; rows become visible at the next manifest save."""
+        import numpy as np
+        count = len(columns["user"])
+        if not count:
+            return
+        rows = self.rows(table)
+        for name, dtype in TABLES[table].items():
+            path = self._column_path(table, name)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.truncate(rows * np.dtype(dtype).itemsize)  # drop bytes of an unfinished earlier refresh
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        self.manifest["tables"][table]["rows"] = rows + count
+
+    def _rewrite(self, table, keep, columns):
+        """Write kept rows plus new rows as a new generation of column files."""
+        import numpy as np
+        meta = self.manifest["tables"][table]
+        old, generation = meta["generation"], meta["generation"] + 1
+        rows = 0
+        for name, dtype in TABLES[table].items():
+            kept = self.column(table, name)[keep]
+            with open(self._column_path(table, name, generation), "wb") as f:
+                f.write(kept.tobytes())
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+            rows = len(kept) + len(columns[name])
+        meta.update(generation=generation, rows=rows)
+        return old
+
+    def _remove_generation(self, table, generation):
+        for name in TABLES[table]:
+            try:
+                os.remove(self._column_path(table, name, generation))
+            except OSError:
+                pass
+
+    def _replace_users(self, table, user_codes, columns):
+        """Drop every row of user_codes and add columns; returns a stale generation to delete, or None."""
+        if user_codes and self.rows(table):
+            import numpy as np
+            keep = ~np.isin(self.column(table, "user"), list(user_codes))
+            if not keep.all():
+                return self._rewrite(table, keep, columns)
+        self._append(table, columns)
+        return None
+
+    # --- queries ---
+
+    def scan(self, table, columns=None, where=None):
+        """
+        {column: array} for the given columns (default: all). Without `where`
+        the arrays are memory maps; `where` (a boolean mask or a function of
+        this store returning one) selects rows first.
+        """
+        names = list(columns or TABLES[table])
+        if where is None:
+            return {name: self.column(table, name) for name in names}
+        mask = where(self) if callable(where) else where
+        return {name: self.column(table, name)[mask] for name in names}
+
+    def aggregate(self, table, by, value=None, how="count", where=None):
+        """
+        Group rows by one column and reduce another: how is "count", "sum",
+        "mean" or "nunique" (distinct values of the other column, e.g. users).
+        Returns {group: result}, decoding dictionary-encoded groups.
+        """
+        import numpy as np
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {how!r} (expected one of {AGGREGATIONS})")
+        data = self.scan(table, [by] + ([value] if value else []), where)
+        keys, inverse = np.unique(data[by], return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(keys))
+        if how == "count":
+            result = counts
+        elif how == "nunique":
+            pairs = np.unique(np.stack([inverse, data[value].astype(np.int64)]), axis=1)
+            result = np.bincount(pairs[0], minlength=len(keys))
+        else:
+            totals = np.bincount(inverse, weights=data[value].astype(float), minlength=len(keys))
+            result = totals if how == "sum" else totals / np.maximum(counts, 1)
+        labels = self.decode(ENCODED[by], keys) if by in ENCODED else keys
+        return {label.item() if hasattr(label, "item") else label: number.item()
+                for label, number in zip(labels, result)}
+
+    def goal_metrics(self, as_of=None):
+        """(months_left, required_monthly) for every goals row, as get_goals_dataframe computes them."""
+        import numpy as np
+        import pandas as pd
+        deadlines = pd.Series(self.column("goals", "deadline").astype("datetime64[ns]"))
+        months_left = np.maximum(1, data_manager.months_until(deadlines, as_of).to_numpy())
+        gap = self.column("goals", "target_amount") - self.column("goals", "current_amount")
+        return months_left, np.maximum(0.0, gap / months_left)
+
+    def plan_tags(self, as_of=None):
+        """Reason tags of every user's current greedy plan, one vectorized pass (goals table order)."""
+        import numpy as np
+        import pandas as pd
+        from modules import planning_engine
+        months_left, required = self.goal_metrics(as_of)
+        goals_df = pd.DataFrame({
+            "user_id": self.column("goals", "user"),
+            "name": self.column("goals", "goal"),
+            "priority": self.column("goals", "priority"),
+            "months_left": months_left,
+            "required_monthly": required,
+        })
+        profiles = self.scan("profiles", ["user", "monthly_savings"])
+        savings = pd.Series(np.asarray(profiles["monthly_savings"]), index=np.asarray(profiles["user"]))
+        plan = planning_engine.plan_allocations_batch(goals_df, savings)
+        return plan["tag"].reindex(goals_df.index)
+
+    # --- refresh ---
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        with _thread_lock:
+            with open(os.path.join(self.path, ".lock"), "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    self.manifest = self._load_manifest()
+                    self._codes = {name: {value: code for code, value in enumerate(values)}
+                                   for name, values in self.manifest["dictionaries"].items()}
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def refresh(self, store=None, log_dir=None):
+        """Ingest what changed since the last refresh; returns counts of what was re-read."""
+        store = store or data_manager.get_store()
+        with self._locked():
+            stale = []
+            profile_users = self._refresh_profiles(store, stale)
+            activity_users, activity_rows = self._refresh_activity(log_dir, stale)
+            self._save_manifest()
+            for table, generation in stale:  # only once the manifest no longer points at them
+                self._remove_generation(table, generation)
+        return {"profiles": profile_users, "activity_users": activity_users, "activity_rows": activity_rows}
+
+    def _refresh_profiles(self, store, stale):
+        known = self.manifest["sources"]["profiles"]
+        users = store.list_users()
+        versions = {username: store.version(username) for username in users}
+        changed = [u for u in users if versions[u] is None or versions[u] != known.get(u)]
+        removed = set(known) - set(users)
+        if not changed and not removed:
+            return 0
+        previously = set(known)
+        profiles = {name: [] for name in TABLES["profiles"]}
+        goals = {name: [] for name in TABLES["goals"]}
+        for username in changed:
+            data = store.get(username)
+            if not data:
+                removed.add(username)
+                continue
+            user = self.encode("user", username)
+            completed = set(data.get("completed_goals", []))
+            rows = data.get("goals", [])
+            income, expenses = float(data.get("income", 0.0)), float(data.get("expenses", 0.0))
+            for name, value in (("user", user), ("income", income), ("expenses", expenses),
+                                ("monthly_savings", data_manager.compute_monthly_savings(income, expenses)),
+                                ("risk_profile", self.encode("risk_profile", data.get("risk_profile"))),
+                                ("goal_count", len(rows))):
+                profiles[name].append(value)
+            for goal in rows:
+                goals["user"].append(user)
+                goals["goal"].append(self.encode("goal", goal["name"]))
+                goals["target_amount"].append(float(goal["target_amount"]))
+                goals["current_amount"].append(float(goal["current_amount"]))
+                goals["deadline"].append(str(goal["deadline"])[:10])
+                goals["priority"].append(int(goal["priority"]))
+                goals["completed"].append(goal["name"] in completed)
+            known[username] = versions[username]
+        for username in removed:
+            known.pop(username, None)
+        # Users ingested before have rows to drop; brand-new users are a plain append
+        replaced = {self.code("user", u) for u in set(changed) | removed if u in previously}
+        for table, columns in (("profiles", profiles), ("goals", goals)):
+            generation = self._replace_users(table, replaced, columns)
+            if generation is not None:
+                stale.append((table, generation))
+        return len(changed) + len(removed)
+
+    def _activity_users(self, log_dir):
+        log_dir = log_dir or activity_log.LOG_DIR
+        users = set()
+        if os.path.isdir(log_dir):
+            for fname in os.listdir(log_dir):
+                # Legacy .json logs are left alone until migrated (refresh --migrate-legacy)
+                for suffix in (activity_log.LOG_SUFFIX, activity_log.ARCHIVE_SUFFIX):
+                    if fname.endswith(suffix):
+                        users.add(fname[:-len(suffix)])
+        return sorted(users)
+
+    def _refresh_activity(self, log_dir, stale):
+        known = self.manifest["sources"]["activity"]
+        columns = {name: [] for name in TABLES["activity"]}
+        reread, touched = set(), 0
+        users = self._activity_users(log_dir)
+        for username in set(known) - set(users):
+            reread.add(self.code("user", username))
+            del known[username]
+        for username in users:
+            log_path = activity_log.get_log_path(username, log_dir)
+            try:
+                st = os.stat(log_path)
+                inode, size = st.st_ino, st.st_size
+            except OSError:
+                inode, size = None, 0
+            segments = activity_log.list_segments(username, log_dir)
+            source = known.get(username)
+            if source and source["inode"] == inode and source["segments"] == segments and size >= source["offset"]:
+                offset = source["offset"]
+                if offset == size:
+                    continue
+                entries = []
+            else:
+                # New user, or the log was rotated / pruned since: re-read everything
+                if source:
+                    reread.add(self.encode("user", username))
+                offset = 0
+                entries = [e for month in segments for e in activity_log.read_segment(username, month, log_dir)]
+            if size > offset:
+                with open(log_path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read(size - offset)
+                chunk = chunk[:chunk.rfind(b"\n") + 1]  # leave a half-written line for next time
+                offset += len(chunk)
+                entries.extend(activity_log.decode_lines(chunk))
+            user = self.encode("user", username)
+            for entry in entries:
+                try:
+                    timestamp = entry["timestamp"][:19]
+                except (KeyError, TypeError):
+                    continue
+                columns["user"].append(user)
+                columns["timestamp"].append(timestamp)
+                columns["action"].append(self.encode("action", entry.get("action")))
+                columns["goal"].append(self.encode("goal", activity_log.entry_goal(entry)))
+            known[username] = {"inode": inode, "offset": offset, "segments": segments}
+            touched += 1
+        generation = self._replace_users("activity", reread, columns)
+        if generation is not None:
+            stale.append(("activity", generation))
+        return touched, len(columns["user"])
+
+
+def refresh(path=ANALYTICS_DIR, store_url=None, log_dir=None, migrate_legacy=False):
+    """Refresh the store; migrate_legacy first converts legacy .json activity logs (which rewrites them)."""
+    if migrate_legacy:
+        activity_log.migrate_all_legacy_logs(log_dir)
+    store = open_store(store_url) if store_url else None
+    try:
+        return ColumnStore(path).refresh(store, log_dir)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def report(path=ANALYTICS_DIR, as_of=None):
+    """A few cross-user aggregates, as an example of scanning the store."""
+    import numpy as np
+    columns = ColumnStore(path)
+    months_left, _ = columns.goal_metrics(as_of)
+    priority = columns.column("goals", "priority")
+    tags = columns.plan_tags(as_of).fillna("").to_numpy(dtype=str)
+    underfunded = np.char.find(tags, "UNDERFUNDED") >= 0
+    return {
+        "users": columns.rows("profiles"),
+        "goals": columns.rows("goals"),
+        "activity_events": columns.rows("activity"),
+        "underfunded_users_by_goal": columns.aggregate("goals", "goal", "user", "nunique", where=underfunded),
+        "mean_months_left_by_priority": {
+            int(p): float(months_left[priority == p].mean()) for p in np.unique(priority)
+        },
+        "events_by_action": columns.aggregate("activity", "action"),
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintain and query the columnar analytics store.")
+    parser.add_argument("command", choices=("refresh", "report"))
+    parser.add_argument("--path", default=ANALYTICS_DIR, help="analytics store directory")
+    parser.add_argument("--store", default=data_manager.STORE_URL, help="profile store URL (json:<dir> or sqlite:<db>)")
+    parser.add_argument("--log-dir", default=activity_log.LOG_DIR, help="activity log directory")
+    parser.add_argument("--migrate-legacy", action="store_true",
+                        help="refresh: convert legacy .json activity logs to JSONL first (otherwise they are skipped)")
+    parser.add_argument("--as-of", help="date for months_left / plans (default: data_manager.TODAY)")
+    args = parser.parse_args(argv)
+    if args.command == "refresh":
+        counts = refresh(args.path, args.store, args.log_dir, args.migrate_legacy)
+        print(f"Re-read {counts['profiles']} profiles and {counts['activity_users']} activity logs "
+              f"({counts['activity_rows']} new events)")
+    else:
+        print(json.dumps(report(args.path, args.as_of), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Module 10: Batch Planning (headless)
+
+- Runs get_goals_dataframe -> plan_allocations -> explain_allocations for
+  every user in a profile store, without importing streamlit.
+- Users are processed in chunks, optionally across a process pool, and the
+  per-goal results are written in bulk to CSV, JSONL or Parquet.
+
+Usage:
+    python -m modules.batch --store json:data --output plans.csv --workers 4
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from modules import data_manager, planning_engine, explanation_engine
+from modules.storage import open_store
+
+FORMATS = ("csv", "jsonl", "parquet")
+DEFAULT_CHUNK_SIZE = 500
+
+
+def plan_users(store_url, usernames, as_of=None):
+    """Plan one chunk of users; returns one row per goal (user_id, name, allocate, tag, explanation, ...)."""
+    import pandas as pd  # loaded in the workers, not for CLI parsing
+    store = open_store(store_url, default_data=data_manager.DEFAULT_DATA)
+    try:
+        frames, savings = [], {}
+        for username in usernames:
+            data = store.get(username)  # never create profiles from a batch job
+            if not data or not data.get("goals"):
+                continue
+            frames.append(pd.DataFrame(data["goals"]).assign(user_id=username))
+            savings[username] = data_manager.compute_monthly_savings(data["income"], data["expenses"])
+    finally:
+        store.close()
+    if not frames:
+        return pd.DataFrame()
+
+    goals_df = data_manager.get_goals_dataframe(pd.concat(frames, ignore_index=True), as_of=as_of)
+    plan = planning_engine.plan_allocations_batch(goals_df, savings)
+
+    plan["explanation"] = explanation_engine.explain_columns(
+        plan["name"], plan["tag"], plan["allocate"].to_numpy(), plan["months_left"].to_numpy()
+    )
+    plan["monthly_savings"] = plan["user_id"].map(savings)
+    return plan.reset_index(drop=True)
+
+
+def _plan_chunk(args):
+    return plan_users(*args)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _Writer:
+    """Appends result chunks to one output file in the chosen format."""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+        self.rows = 0
+        self._parquet = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fmt != "parquet":
+            open(path, "w").close()
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        elif self.fmt == "jsonl":
+            df.to_json(self.path, mode="a", orient="records", lines=True, date_format="iso")
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run_batch(store_url, output, fmt=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, as_of=None):
+    """Plan every user in the store and write the results. Returns (users, rows written)."""
+    fmt = fmt or os.path.splitext(output)[1].lstrip(".") or "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt!r} (expected one of {FORMATS})")
+    store = open_store(store_url)
+    try:
+        usernames = store.list_users()
+    finally:
+        store.close()
+
+    tasks = [(store_url, chunk, as_of) for chunk in _chunks(usernames, chunk_size)]
+    writer = _Writer(output, fmt)
+    try:
+        if workers <= 1:
+            for task in tasks:
+                writer.write(_plan_chunk(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(_plan_chunk, tasks):
+                    writer.write(result)
+    finally:
+        writer.close()
+    return len(usernames), writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run month-end goal planning for every user.")
+    parser.add_argument("--store", default=data_manager.STORE_URL, help="profile store URL (json:<dir> or sqlite:<db>)")
+    parser.add_argument("--output", required=True, help="output file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="users per chunk")
+    parser.add_argument("--as-of", help="planning date, YYYY-MM-DD (default: data_manager.TODAY)")
+    args = parser.parse_args(argv)
+    users, rows = run_batch(args.store, args.output, args.format, args.workers, args.chunk_size, args.as_of)
+    print(f"Planned {users} users, wrote {rows} goal rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Module 8: Derived Data Cache
+
+- Process-wide cache for values derived from a user's stored data
+  (profile dict, goals DataFrame, calendar table, recent activity).
+- Entries are grouped per (user, scope) and tagged with the scope's source
+  version (store version / log inode and size); writers invalidate
+  explicitly, and the version is re-checked at most every REVALIDATE_SECONDS
+  to catch writes from other processes.
+- Lets a Streamlit rerun that changes nothing skip file I/O and DataFrame
+  construction entirely.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+REVALIDATE_SECONDS = 5.0
+MAX_ENTRIES = 1024
+
+
+class VersionedCache:
+    """LRU of {(user, scope): {version, checked_at, values}}."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, revalidate_seconds=REVALIDATE_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username, scope, key, compute, version_fn):
+        """
+        Return the cached value for key, computing it with compute() on a miss.
+        version_fn() returns the scope's current source version; it is only
+        called for new entries and when an entry is due for revalidation.
+        """
+        slot = (username, scope)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(slot)
+            fresh = entry is not None and now - entry["checked_at"] < self.revalidate_seconds
+            if fresh:
+                # Lookup and LRU touch in one critical section: the slot can't vanish in between
+                self._entries.move_to_end(slot)
+                if key in entry["values"]:
+                    return entry["values"][key]
+        if not fresh:
+            version = version_fn()
+            with self._lock:
+                entry = self._entries.get(slot)
+                if entry is None or entry["version"] != version:
+                    entry = {"version": version, "checked_at": now, "values": {}}
+                    self._entries[slot] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                else:
+                    entry["checked_at"] = now
+                    self._entries.move_to_end(slot)
+                if key in entry["values"]:
+                    return entry["values"][key]
+        values = entry["values"]
+        value = compute()
+        with self._lock:
+            values.setdefault(key, value)
+            return values[key]
+
+    def put(self, username, scope, key, value, version):
+        """Store a value computed by the caller for the given source version (e.g. right after a write)."""
+        slot = (username, scope)
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is None or entry["version"] != version:
+                entry = self._entries[slot] = {"version": version, "checked_at": self.clock(), "values": {}}
+            entry["values"][key] = value
+            self._entries.move_to_end(slot)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username=None, scope=None):
+        """Drop entries for a user (all users if None), optionally one scope only."""
+        with self._lock:
+            for slot in list(self._entries):
+                if (username is None or slot[0] == username) and (scope is None or slot[1] == scope):
+                    del self._entries[slot]
+
+    def clear(self):
+        self.invalidate()
+
+
+default_cache = VersionedCache()
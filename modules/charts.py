@@ -0,0 +1,108 @@
+"""
+Module 9: Chart Rendering
+
+- Renders goal progress charts to PNG/SVG bytes for st.image / downloads.
+- Memoizes rendered bytes by a hash of the chart data, with bounded LRU eviction.
+- Imports matplotlib only when a chart actually has to be drawn, and draws on
+  standalone Figure objects (never registered with pyplot), so no figures
+  accumulate in a long-running server.
+"""
+
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+CHART_CACHE_SIZE = 128
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _chart_key(kind, fmt, labels, current, target):
+    payload = repr((kind, fmt, list(labels), [float(c) for c in current], [float(t) for t in target]))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _memoized(kind, fmt, labels, current, target, draw):
+    key = _chart_key(kind, fmt, labels, current, target)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    data = draw()
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def _to_bytes(fig, fmt):
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    fig.clear()
+    return buf.getvalue()
+
+
+def render_goal_progress_chart(labels, current, target, fmt="png"):
+    """
+    Current vs target horizontal bars with value labels; switches to a log
+    x-axis when targets span more than 10x. Returns image bytes.
+    """
+    labels, current, target = list(labels), list(current), list(target)
+
+    def draw():
+        import numpy as np
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8, 0.6 * len(labels) + 1))
+        ax = fig.subplots()
+        bar_width = 0.35
+        y = np.arange(len(labels))
+        # Use log scale for x-axis if range is large
+        max_target = max(target)
+        min_target = min(target)
+        use_log = max_target > 10 * max(min_target, 1)
+        # Plot bars
+        ax.barh(y - bar_width/2, target, height=bar_width, color="#e0e0e0", label="Target")
+        ax.barh(y + bar_width/2, current, height=bar_width, color="#4f8cff", label="Current")
+        # Add value labels
+        for i, (c, t) in enumerate(zip(current, target)):
+            ax.text(c, i + bar_width/2, f"₹{c:.0f}", va='center', ha='left', fontsize=9, color="#4f8cff", weight='bold')
+            ax.text(t, i - bar_width/2, f"₹{t:.0f}", va='center', ha='right', fontsize=9, color="#888888")
+        ax.set_yticks(y)
+        ax.set_yticklabels(labels)
+        ax.set_xlabel("Amount (₹)")
+        ax.legend(loc='upper right')
+        ax.grid(axis='x', linestyle='--', alpha=0.5)
+        if use_log:
+            ax.set_xscale('log')
+            ax.set_xlim(left=max(1, min(min(current), min(target))), right=max(max(current), max(target))*1.2)
+        else:
+            ax.set_xlim(left=0, right=max(max(current), max(target))*1.2)
+        fig.tight_layout()
+        return _to_bytes(fig, fmt)
+
+    return _memoized("goal_progress", fmt, labels, current, target, draw)
+
+
+def render_progress_bars(labels, current, target, fmt="png"):
+    """Simple overlaid current/target bars (the "View Progress" chart). Returns image bytes."""
+    labels, current, target = list(labels), list(current), list(target)
+
+    def draw():
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8, 3))
+        ax = fig.subplots()
+        ax.barh(labels, target, color="#e0e0e0", label="Target")
+        ax.barh(labels, current, color="#4f8cff", label="Current")
+        ax.set_xlabel("Amount (₹)")
+        ax.legend()
+        return _to_bytes(fig, fmt)
+
+    return _memoized("progress_bars", fmt, labels, current, target, draw)
+
+
+def clear_chart_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -2,18 +2,22 @@
 Module 1: Data Ingestion and Profile Manager
 
 - Handles loading, saving, and updating user profile and goals.
+- Per-user profiles go through a pluggable store (see modules/storage.py),
+  selected with the FINAI_STORE environment variable.
 - Uses synthetic data if no file exists.
 - Computes monthly savings and goal planning DataFrame.
+- NumPy/pandas are imported on first use of the DataFrame helpers, so
+  profile I/O and the pandas-free planning path start without them.
 - Addresses research gap: Standardizes user data for holistic, goal-oriented planning.
 """
 
 import os
 import json
+import threading
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
-import pandas as pd
 
 DATA_PATH = os.path.join("data", "synthetic_user.json")
+STORE_URL = os.environ.get("FINAI_STORE", "json:data")  # or "sqlite:data/finai.db"
 TODAY = datetime(2025, 9, 24)  # Hardcoded for reproducibility
 
 DEFAULT_DATA = {
@@ -62,28 +66,84 @@ def load_user_data():
     with open(DATA_PATH, "r") as f:
         return json.load(f)
 
-def save_user_data(data):
-    """Save user data to JSON, converting any Timestamps to strings."""
-    # Convert deadlines to string for JSON serialization
+def _stringify_deadlines(data):
+    """Convert any Timestamp / datetime / date deadlines to YYYY-MM-DD strings for serialization."""
     for goal in data.get("goals", []):
         if not isinstance(goal["deadline"], str):
-            goal["deadline"] = str(goal["deadline"].date())  # or .strftime("%Y-%m-%d")
+            goal["deadline"] = str(goal["deadline"])[:10]
+    return data
+
+def save_user_data(data):
+    """Save user data to JSON, converting any Timestamps to strings."""
+    _stringify_deadlines(data)
     with open(DATA_PATH, "w") as f:
         json.dump(data, f, indent=2)
 
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide profile store, opening STORE_URL on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from modules.storage import open_store
+            _store = open_store(STORE_URL, default_data=DEFAULT_DATA)
+        return _store
+
+def set_store(store):
+    """Replace the process-wide profile store (e.g. with a SQLiteStore)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+def load_profile(username, store=None):
+    """Load a user's profile from the store (defaults for new users)."""
+    return (store or get_store()).load(username)
+
+def save_profile(username, data, store=None):
+    """Save a user's profile to the store, converting any Timestamps to strings."""
+    (store or get_store()).save(username, _stringify_deadlines(data))
+
 def compute_monthly_savings(income, expenses):
     """Compute monthly savings."""
     return income - expenses
 
-def get_goals_dataframe(goals):
+def months_until(deadlines, as_of=None):
     """
-    Convert goals list to DataFrame and compute:
-    - months_left: months until deadline
-    - required_monthly: (target - current) / months_left
+    Vectorized equivalent of relativedelta(d, as_of).years * 12 + .months
+    over a datetime Series: whole months from as_of to each deadline,
+    truncated toward zero (as_of's day is clipped to each month's length).
     """
-    df = pd.DataFrame(goals)
+    import numpy as np
+    import pandas as pd
+    as_of = pd.Timestamp(as_of if as_of is not None else TODAY)
+    year = deadlines.dt.year.astype("int64")
+    month = deadlines.dt.month.astype("int64")
+    day = deadlines.dt.day.astype("int64")
+    months = (year - as_of.year) * 12 + (month - as_of.month)
+    # Day-of-month and time-of-day, in ns, of the deadline and of as_of shifted
+    # into the deadline's month; a partial month is dropped when they disagree.
+    day_ns = 86400 * 10**9
+    deadline_key = day * day_ns + (deadlines - deadlines.dt.normalize()).astype("int64")
+    shifted_day = np.minimum(as_of.day, deadlines.dt.days_in_month.astype("int64"))
+    as_of_key = shifted_day * day_ns + (as_of - as_of.normalize()).value
+    future = deadlines >= as_of
+    months -= (future & (deadline_key < as_of_key)).astype("int64")
+    months += (~future & (deadline_key > as_of_key)).astype("int64")
+    return months
+
+def get_goals_dataframe(goals, as_of=None):
+    """
+    Convert goals (list of dicts, or a DataFrame such as a multi-user frame
+    with a user_id column) to DataFrame and compute:
+    - months_left: months until deadline, as of as_of (default TODAY), min 1
+    - required_monthly: (target - current) / months_left, clipped at 0
+    """
+    import pandas as pd
+    df = goals.copy() if isinstance(goals, pd.DataFrame) else pd.DataFrame(goals)
     df["deadline"] = pd.to_datetime(df["deadline"])
-    df["months_left"] = df["deadline"].apply(lambda d: max(1, (relativedelta(d, TODAY).years * 12 + relativedelta(d, TODAY).months)))
+    df["months_left"] = months_until(df["deadline"], as_of).clip(lower=1)
     df["required_monthly"] = (df["target_amount"] - df["current_amount"]) / df["months_left"]
     df["required_monthly"] = df["required_monthly"].clip(lower=0)
     return df
@@ -96,4 +156,130 @@ def update_goal(df, idx, allocation):
 def update_goals_in_data(data, updated_df):
     """Update the goals in the user data dict from DataFrame."""
     data["goals"] = updated_df.to_dict(orient="records")
-    return data
\ No newline at end of file
+    return data
+
+def refresh_goal_metrics(df, idx, fields, as_of=None):
+    """Write fields into row idx of a goals DataFrame and recompute only that row's metrics."""
+    import pandas as pd
+    for key, value in fields.items():
+        df.at[idx, key] = pd.Timestamp(value) if key == "deadline" else value
+    row = df.loc[[idx]]
+    months_left = int(months_until(row["deadline"], as_of).clip(lower=1).iloc[0])
+    df.at[idx, "months_left"] = months_left
+    df.at[idx, "required_monthly"] = max(0.0, (row["target_amount"].iloc[0] - row["current_amount"].iloc[0]) / months_left)
+    return df
+
+class GoalSession:
+    """
+    Buffered edits to one user's profile and goals, written once per rerun.
+    - update_goal / set_profile / add_goal change the in-memory profile dict
+      and record what is dirty; unchanged values are ignored.
+    - update_goal also patches months_left / required_monthly of that row in
+      goals_df (copied on first write, so a cached frame is never mutated).
+    - flush() persists all pending changes with one store call: only the dirty
+      goal rows where the store supports it, the whole profile otherwise.
+    - Each change is also recorded as a structured goal event (add, edit,
+      allocation, complete) and appended to the user's goal history at flush
+      (see modules/goal_history.py).
+    """
+
+    def __init__(self, username, data, goals_df=None, store=None, as_of=None):
+        self.username = username
+        self.data = data
+        self.store = store
+        self.as_of = as_of
+        self._goals_df = goals_df
+        self._owns_goals_df = False
+        self.dirty_goals = set()
+        self.profile_dirty = False
+        self.structure_dirty = False
+        self.events = []
+        self._baseline = None
+
+    @property
+    def goals_df(self):
+        """Goals frame reflecting pending edits (None once goals were added)."""
+        return self._goals_df
+
+    @property
+    def dirty(self):
+        return bool(self.dirty_goals) or self.profile_dirty or self.structure_dirty
+
+    def _record(self, kind, goal, idx, fields):
+        """Queue a goal event; the first one captures the pre-change state if no history exists yet."""
+        from modules import goal_history
+        if not goal_history.ENABLED:
+            return
+        if not self.events and self._baseline is None and not goal_history.has_history(self.username):
+            self._baseline = goal_history.state_of(self.data)
+        self.events.append(goal_history.make_event(kind, goal, idx, fields))
+
+    def update_goal(self, idx, **fields):
+        """Change fields of goal idx; returns True if anything changed."""
+        return self._update_goal(idx, fields, "edit")
+
+    def allocate(self, idx, amount):
+        """Add amount to goal idx's current_amount, recorded as an allocation event."""
+        current = self.data["goals"][idx]["current_amount"]
+        return self._update_goal(idx, {"current_amount": current + amount}, "allocation", amount=amount)
+
+    def _update_goal(self, idx, fields, kind, **extra):
+        goal = self.data["goals"][idx]
+        if "deadline" in fields and not isinstance(fields["deadline"], str):
+            fields["deadline"] = str(fields["deadline"])[:10]
+        changed = {k: v for k, v in fields.items() if goal.get(k) != v}
+        if not changed:
+            return False
+        self._record(kind, changed.get("name", goal["name"]), idx, dict(changed, **extra))
+        goal.update(changed)
+        self.dirty_goals.add(idx)
+        if self._goals_df is not None:
+            if not self._owns_goals_df:
+                self._goals_df = self._goals_df.copy()
+                self._owns_goals_df = True
+            refresh_goal_metrics(self._goals_df, idx, changed, self.as_of)
+        return True
+
+    def set_profile(self, **fields):
+        """Change profile-level fields (income, expenses, email, completed_goals, ...)."""
+        changed = {k: v for k, v in fields.items() if self.data.get(k) != v}
+        if "completed_goals" in changed:
+            done = set(self.data.get("completed_goals", []))
+            for name in changed["completed_goals"]:
+                if name not in done:
+                    idx = next((i for i, g in enumerate(self.data.get("goals", [])) if g["name"] == name), -1)
+                    self._record("complete", name, idx, {})
+        if changed:
+            self.data.update(changed)
+            self.profile_dirty = True
+        return bool(changed)
+
+    def add_goal(self, goal):
+        """Append a goal; the next flush rewrites the whole goal list."""
+        fields = dict(goal)
+        if not isinstance(fields.get("deadline", ""), str):
+            fields["deadline"] = str(fields["deadline"])[:10]
+        self._record("add", goal["name"], len(self.data.get("goals", [])), fields)
+        self.data.setdefault("goals", []).append(dict(fields))  # the event keeps its own copy
+        self.structure_dirty = True
+        self._goals_df = None
+
+    def flush(self):
+        """Persist pending changes in a single write. Returns True if anything was written."""
+        if not self.dirty:
+            return False
+        store = self.store or get_store()
+        _stringify_deadlines(self.data)
+        if self.structure_dirty:
+            store.save(self.username, self.data)
+        else:
+            store.save_changes(self.username, self.data, sorted(self.dirty_goals))
+        if self.events:
+            from modules import goal_history
+            goal_history.append_events(self.username, self.events, self._baseline)
+            self.events = []
+            self._baseline = None
+        self.dirty_goals.clear()
+        self.profile_dirty = self.structure_dirty = False
+        self._owns_goals_df = False
+        return True
@@ -3,6 +3,12 @@ Module 3: Explanation Engine
 
 - Maps reason tags to natural-language templates for XAI.
 - Generates explanations for each goal allocation.
+- Compound tags (e.g. HIGH_PRIORITY_DEADLINE_APPROACHING_UNDERFUNDED) are
+  composed from their parts: one lead sentence (priority / deadline) plus
+  one status sentence (on track / underfunded / complete).
+- Each distinct tag is rendered to a format string once and cached, and
+  explain_columns / iter_explanations explain columnar batch output (e.g.
+  plan_allocations_batch) without building a dict per goal.
 - Addresses research gap: Transparency and user trust via explainability.
 """
 
@@ -16,6 +22,55 @@ TEMPLATES = {
     "STANDARD": "Allocating to {goal} as per your plan."
 }
 
+# Component tags in the order planning_engine joins them
+TAG_PARTS = ("HIGH_PRIORITY", "DEADLINE_APPROACHING", "ON_TRACK", "UNDERFUNDED", "GOAL_COMPLETE")
+_LEAD_PARTS = ("HIGH_PRIORITY", "DEADLINE_APPROACHING")
+
+_ALLOC_SUFFIX = " Allocating ${alloc:.2f} ({months_left} months left)."
+_COMPLETE_SUFFIX = " No allocation needed."
+
+_template_cache = {}
+
+
+def split_tag(tag):
+    """Component tags of a (possibly compound) tag, or None if it isn't made of known parts."""
+    parts, rest = [], tag
+    for part in TAG_PARTS:
+        if rest == part or rest.startswith(part + "_"):
+            parts.append(part)
+            rest = rest[len(part) + 1:]
+    return parts if not rest else None
+
+
+def compose_template(tag):
+    """Sentence template for a tag: TEMPLATES entry if present, else composed from its parts."""
+    if tag in TEMPLATES:
+        return TEMPLATES[tag]
+    parts = split_tag(tag)
+    if not parts:
+        return TEMPLATES["STANDARD"]
+    lead = "_".join(p for p in parts if p in _LEAD_PARTS)
+    status = [TEMPLATES[p] for p in parts if p not in _LEAD_PARTS]
+    return " ".join([TEMPLATES[lead or "STANDARD"]] + status)
+
+
+def _templates(tag):
+    """(with-allocation, without-allocation) format strings for tag, cached per distinct tag."""
+    cached = _template_cache.get(tag)
+    if cached is None:
+        base = compose_template(tag).replace("{goal}", "{0}")
+        no_alloc = base + (_COMPLETE_SUFFIX if "GOAL_COMPLETE" in tag else "")
+        with_alloc = base + _ALLOC_SUFFIX.replace("{alloc", "{1").replace("{months_left}", "{2}")
+        cached = _template_cache[tag] = (with_alloc, no_alloc)
+    return cached
+
+
+def explain_one(goal, tag, alloc, months_left):
+    """Explanation for one goal's allocation."""
+    with_alloc, no_alloc = _templates(tag)
+    return with_alloc.format(goal, alloc, months_left) if alloc > 0 else no_alloc.format(goal)
+
+
 def explain_allocations(reason_tags):
     """
     For each goal, generate a natural-language explanation based on tags.
@@ -24,16 +79,28 @@ def explain_allocations(reason_tags):
     explanations = {}
     for tag_info in reason_tags:
         goal = tag_info["goal"]
-        tag = tag_info["tag"]
-        alloc = tag_info["allocate"]
-        months_left = tag_info["months_left"]
-
-        # Pick template (combine if multiple tags)
-        template = TEMPLATES.get(tag, TEMPLATES["STANDARD"])
-        explanation = template.format(goal=goal)
-        if alloc > 0:
-            explanation += f" Allocating ${alloc:.2f} ({months_left} months left)."
-        elif "GOAL_COMPLETE" in tag:
-            explanation += " No allocation needed."
-        explanations[goal] = explanation
-    return explanations
\ No newline at end of file
+        explanations[goal] = explain_one(goal, tag_info["tag"], tag_info["allocate"], tag_info["months_left"])
+    return explanations
+
+
+def iter_explanations(goals, tags, allocate, months_left):
+    """
+    Yield one explanation per row of columnar reason tags (equal-length
+    sequences, arrays or Series). Rows with tag None (no reason tag, e.g.
+    goals reached after savings ran out) yield "".
+    """
+    for goal, tag, alloc, months in zip(goals, tags, allocate, months_left):
+        if tag is None:
+            yield ""
+            continue
+        with_alloc, no_alloc = _template_cache.get(tag) or _templates(tag)
+        yield with_alloc.format(goal, alloc, months) if alloc > 0 else no_alloc.format(goal)
+
+
+def explain_columns(goals, tags, allocate, months_left):
+    """List of explanations for columnar reason tags (see iter_explanations)."""
+    if hasattr(allocate, "tolist"):
+        allocate = allocate.tolist()  # Python floats/ints format faster than NumPy scalars
+    if hasattr(months_left, "tolist"):
+        months_left = months_left.tolist()
+    return list(iter_explanations(goals, tags, allocate, months_left))
@@ -0,0 +1,126 @@
+"""
+Module 12: Report Export
+
+- Streams goals and activity-log exports as CSV byte chunks, optionally
+  gzip-compressed, so memory stays flat regardless of log size.
+- Activity rows are read from the JSONL log in chunks (no row cap).
+- Bulk export of every user's goals and activity to a directory, usable
+  from cron without streamlit.
+
+Usage:
+    python -m modules.export --store json:data --log-dir data --output exports --gzip
+"""
+
+import argparse
+import csv
+import io
+import os
+import tempfile
+import zlib
+
+from modules import activity_log, data_manager
+from modules.storage import GOAL_FIELDS, open_store
+
+ACTIVITY_FIELDS = ("timestamp", "action", "details", "goal")
+CHUNK_ROWS = 2000
+
+
+def iter_csv(rows, fieldnames, chunk_rows=CHUNK_ROWS):
+    """Yield UTF-8 CSV bytes (header first), flushing every chunk_rows rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def goals_csv_chunks(goals, compress=False):
+    """CSV export of a goals list; extra goal keys beyond the stored fields are dropped."""
+    chunks = iter_csv(goals, GOAL_FIELDS)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def activity_csv_chunks(username, log_dir=None, compress=False):
+    """CSV export of a user's full activity log, oldest first, streamed from disk."""
+    chunks = iter_csv(activity_log.iter_user_activity(username, log_dir), ACTIVITY_FIELDS)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def spool(chunks):
+    """
+    Payload bytes for st.download_button, which needs the whole payload:
+    chunks go through an anonymous temp file first, so only one copy of the
+    export is ever held in memory.
+    """
+    with tempfile.TemporaryFile(suffix=".export") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.seek(0)
+        return f.read()
+
+
+def write_chunks(path, chunks):
+    """Write chunks to path atomically."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, path)
+
+
+def export_all(store_url, output_dir, log_dir=None, compress=False):
+    """
+    Write <user>_goals.csv and <user>_activity_log.csv (.gz when compressed)
+    for every user in the store. Returns the number of users exported.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = ".csv.gz" if compress else ".csv"
+    store = open_store(store_url)
+    count = 0
+    try:
+        for username in store.list_users():
+            data = store.get(username)
+            if data is None:
+                continue
+            write_chunks(os.path.join(output_dir, f"{username}_goals{suffix}"),
+                         goals_csv_chunks(data.get("goals", []), compress))
+            write_chunks(os.path.join(output_dir, f"{username}_activity_log{suffix}"),
+                         activity_csv_chunks(username, log_dir, compress))
+            count += 1
+    finally:
+        store.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export goals and activity logs for every user.")
+    parser.add_argument("--store", default=data_manager.STORE_URL, help="profile store URL (json:<dir> or sqlite:<db>)")
+    parser.add_argument("--log-dir", default=activity_log.LOG_DIR, help="directory holding the activity logs")
+    parser.add_argument("--output", required=True, help="directory to write the exports into")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress each file")
+    args = parser.parse_args(argv)
+    count = export_all(args.store, args.output, args.log_dir, args.gzip)
+    print(f"Exported {count} users to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
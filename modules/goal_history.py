@@ -0,0 +1,310 @@
+"""
+Module 16: Goal History (event-sourced)
+
+- Append-only stream of structured goal events per user (add, edit,
+  allocation, completion) in data/<user>_goal_events.jsonl, with an 8-byte
+  offset index like the activity log.
+- Every SNAPSHOT_EVERY events a snapshot of the full goal state is appended
+  to <user>_goal_snapshots.jsonl, indexed by (timestamp, event count).
+- goals_as_of() rebuilds a user's goals at any timestamp from the nearest
+  earlier snapshot plus only the events after it, so replay cost stays
+  bounded however long the history grows.
+- GoalSession (data_manager) records events as edits are made and writes
+  them at flush, next to the profile save.
+"""
+
+import os
+import copy
+import json
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+HISTORY_DIR = "data"
+ENABLED = os.environ.get("FINAI_GOAL_HISTORY", "1") == "1"
+SNAPSHOT_EVERY = 100
+
+EVENTS_SUFFIX = "_goal_events.jsonl"
+EVENTS_INDEX_SUFFIX = "_goal_events.idx"
+SNAPSHOTS_SUFFIX = "_goal_snapshots.jsonl"
+SNAPSHOTS_INDEX_SUFFIX = "_goal_snapshots.idx"
+EVENT_TYPES = ("add", "edit", "allocation", "complete")
+
+_STAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+_OFFSET = struct.Struct("<Q")
+# Snapshot index record: timestamp, events applied, byte offset in the snapshots file
+_SNAPSHOT = struct.Struct("<19sQQ")
+_thread_lock = threading.Lock()
+
+
+def _path(username, suffix, history_dir=None):
+    return os.path.join(history_dir or HISTORY_DIR, f"{username}{suffix}")
+
+
+def _stamp(value=None, end_of_day=False):
+    """Comparable "YYYY-MM-DD HH:MM:SS" string; bare dates cover the whole day."""
+    if value is None:
+        return datetime.now().strftime(_STAMP_FORMAT)
+    if isinstance(value, datetime):
+        return value.strftime(_STAMP_FORMAT)
+    if isinstance(value, date):
+        value = value.isoformat()
+    value = str(value)
+    if len(value) == 10:
+        value += " 23:59:59" if end_of_day else " 00:00:00"
+    return value[:19]
+
+
+def make_event(kind, goal, index, fields, ts=None):
+    """One event dict; fields holds the new values (the full goal for "add")."""
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"Unknown goal event type: {kind!r} (expected one of {EVENT_TYPES})")
+    return {"ts": _stamp(ts), "type": kind, "goal": goal, "index": index, "fields": fields}
+
+
+def state_of(data):
+    """The part of a profile the history tracks: goals and completed goal names."""
+    goals = copy.deepcopy(data.get("goals", []))
+    for goal in goals:
+        if not isinstance(goal.get("deadline", ""), str):
+            goal["deadline"] = str(goal["deadline"])[:10]
+    return {"goals": goals, "completed_goals": list(data.get("completed_goals", []))}
+
+
+def apply_event(state, event):
+    """Apply one event to a state dict in place."""
+    kind, fields = event["type"], event["fields"]
+    goals = state["goals"]
+    if kind == "add":
+        goals.append(dict(fields))
+    elif kind in ("edit", "allocation"):
+        if 0 <= event["index"] < len(goals):
+            goals[event["index"]].update({k: v for k, v in fields.items() if k != "amount"})
+    elif kind == "complete":
+        if event["goal"] not in state["completed_goals"]:
+            state["completed_goals"].append(event["goal"])
+    return state
+
+
+@contextmanager
+def _locked(username, history_dir=None):
+    idx_path = _path(username, EVENTS_INDEX_SUFFIX, history_dir)
+    os.makedirs(os.path.dirname(idx_path) or ".", exist_ok=True)
+    with _thread_lock:
+        with open(idx_path, "ab") as idx:
+            if fcntl is not None:
+                fcntl.flock(idx.fileno(), fcntl.LOCK_EX)
+            try:
+                yield idx
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(idx.fileno(), fcntl.LOCK_UN)
+
+
+def has_history(username, history_dir=None):
+    """True once the initial snapshot is written (an empty index counts as none)."""
+    try:
+        return os.path.getsize(_path(username, SNAPSHOTS_INDEX_SUFFIX, history_dir)) >= _SNAPSHOT.size
+    except OSError:
+        return False
+
+
+def _event_count(username, history_dir=None):
+    try:
+        return os.path.getsize(_path(username, EVENTS_INDEX_SUFFIX, history_dir)) // _OFFSET.size
+    except OSError:
+        return 0
+
+
+class _SnapshotIndex:
+    """
+    Snapshot index records (ts, seq, offset) by position, for use as a context
+    manager: the index is opened on entry (only if it has records) and closed
+    on exit. len() is 0 when there are no snapshots yet.
+    """
+
+    def __init__(self, username, history_dir=None):
+        self.path = _path(username, SNAPSHOTS_INDEX_SUFFIX, history_dir)
+        self._file = None
+        self._count = 0
+
+    def __enter__(self):
+        try:
+            self._count = os.path.getsize(self.path) // _SNAPSHOT.size
+        except OSError:
+            self._count = 0
+        if self._count:
+            self._file = open(self.path, "rb")
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(f"snapshot {i} out of range ({self._count} snapshots)")
+        self._file.seek(i * _SNAPSHOT.size)
+        ts, seq, offset = _SNAPSHOT.unpack(self._file.read(_SNAPSHOT.size))
+        return ts.decode("ascii"), seq, offset
+
+
+def _write_snapshot(username, state, seq, ts, history_dir=None):
+    """Append a snapshot of state after `seq` events (caller holds the lock)."""
+    path = _path(username, SNAPSHOTS_SUFFIX, history_dir)
+    with open(path, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write((json.dumps({"ts": ts, "seq": seq, "state": state}) + "\n").encode("utf-8"))
+    with open(_path(username, SNAPSHOTS_INDEX_SUFFIX, history_dir), "ab") as idx:
+        idx.write(_SNAPSHOT.pack(ts.encode("ascii"), seq, offset))
+
+
+def _read_snapshot(username, offset, history_dir=None):
+    with open(_path(username, SNAPSHOTS_SUFFIX, history_dir), "rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+def _iter_events_from(username, seq, history_dir=None):
+    """Events with sequence number >= seq, in order."""
+    idx_path = _path(username, EVENTS_INDEX_SUFFIX, history_dir)
+    events_path = _path(username, EVENTS_SUFFIX, history_dir)
+    if seq >= _event_count(username, history_dir):
+        return
+    with open(idx_path, "rb") as idx:
+        idx.seek(seq * _OFFSET.size)
+        start = _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+    with open(events_path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # torn write from a crashed appender
+
+
+def initial_state(username, history_dir=None):
+    """(timestamp, state) of the first snapshot: the goals before any recorded event."""
+    with _SnapshotIndex(username, history_dir) as snapshots:
+        if not snapshots:
+            return None
+        ts, _, offset = snapshots[0]
+    return ts, _read_snapshot(username, offset, history_dir)["state"]
+
+
+def read_events(username, offset=0, history_dir=None):
+    """
+    (events, next offset) for every complete event line from byte offset on;
+    lets incremental consumers keep a cursor instead of rereading the stream.
+    """
+    try:
+        with open(_path(username, EVENTS_SUFFIX, history_dir), "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+    except OSError:
+        return [], offset
+    chunk = chunk[:chunk.rfind(b"\n") + 1]  # a line still being written is picked up next time
+    events = []
+    for line in chunk.splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue  # torn write from a crashed appender
+    return events, offset + len(chunk)
+
+
+def append_events(username, events, baseline=None, history_dir=None):
+    """
+    Append events (oldest first). baseline is the state before the first of
+    them; it seeds the history with an initial snapshot when none exists yet.
+    Writes a new snapshot once SNAPSHOT_EVERY events accumulated since the last.
+    """
+    if not events:
+        return 0
+    events_path = _path(username, EVENTS_SUFFIX, history_dir)
+    with _locked(username, history_dir) as idx:
+        seq = idx.seek(0, os.SEEK_END) // _OFFSET.size
+        if not has_history(username, history_dir):
+            # Drop an empty or torn index so the initial record lands at offset 0
+            open(_path(username, SNAPSHOTS_INDEX_SUFFIX, history_dir), "wb").close()
+            initial = baseline if baseline is not None else {"goals": [], "completed_goals": []}
+            _write_snapshot(username, initial, seq, events[0]["ts"], history_dir)
+        packed = []
+        with open(events_path, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for event in events:
+                line = (json.dumps(event) + "\n").encode("utf-8")
+                f.write(line)
+                packed.append(_OFFSET.pack(offset))
+                offset += len(line)
+        idx.write(b"".join(packed))
+        idx.flush()
+        total = seq + len(events)
+        with _SnapshotIndex(username, history_dir) as snapshots:
+            _, last_seq, last_offset = snapshots[-1]  # the initial snapshot above guarantees one
+        if total - last_seq >= SNAPSHOT_EVERY:
+            state = _read_snapshot(username, last_offset, history_dir)["state"]
+            for event in _iter_events_from(username, last_seq, history_dir):
+                apply_event(state, event)
+            _write_snapshot(username, state, total, events[-1]["ts"], history_dir)
+    return len(events)
+
+
+def goals_as_of(username, when=None, history_dir=None):
+    """
+    {"goals": [...], "completed_goals": [...]} as they were at `when`
+    (datetime, date or "YYYY-MM-DD[ HH:MM:SS]"; a bare date means end of
+    that day; None means now). Returns None if there is no history that early.
+    """
+    stamp = _stamp(when, end_of_day=True) if when is not None else "9999-12-31 23:59:59"
+    with _SnapshotIndex(username, history_dir) as snapshots:
+        lo, hi = 0, len(snapshots)  # last snapshot with ts <= stamp
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if snapshots[mid][0] <= stamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        _, seq, offset = snapshots[lo - 1]
+    state = _read_snapshot(username, offset, history_dir)["state"]
+    for event in _iter_events_from(username, seq, history_dir):
+        if event["ts"] > stamp:
+            break
+        apply_event(state, event)
+    return state
+
+
+def iter_events(username, start=None, end=None, goal=None, history_dir=None):
+    """Events in [start, end] (optionally for one goal), oldest first, for audits."""
+    start = _stamp(start) if start is not None else None
+    end = _stamp(end, end_of_day=True) if end is not None else None
+    first = 0
+    if start:
+        # Skip ahead with the snapshot index: events before a snapshot older than start are older too
+        with _SnapshotIndex(username, history_dir) as snapshots:
+            for i in range(len(snapshots) - 1, -1, -1):
+                ts, seq, _ = snapshots[i]
+                if ts < start:
+                    first = seq
+                    break
+    for event in _iter_events_from(username, first, history_dir):
+        if start and event["ts"] < start:
+            continue
+        if end and event["ts"] > end:
+            break
+        if goal is None or event["goal"] == goal:
+            yield event
@@ -0,0 +1,128 @@
+"""
+Module 15: Lightweight Goal Records
+
+- Pandas-free fast path for planning a single profile (typically 3-10 goals).
+- GoalRecord: slotted per-goal record with months_left / required_monthly
+  computed exactly like data_manager.get_goals_dataframe.
+- plan_records: same output as planning_engine.plan_allocations (greedy and
+  weighted modes) on records, reusing the engine's reason tags and
+  water-filling instead of going through a DataFrame.
+- to_dataframe: converts records to a goals DataFrame only where the UI or
+  the projection / Monte Carlo engines need one.
+- explain_allocations needs no counterpart: it already works on plain dicts.
+"""
+
+import calendar
+from datetime import date, datetime
+
+from modules import planning_engine
+from modules.data_manager import TODAY
+
+GOAL_FIELDS = ("name", "target_amount", "current_amount", "deadline", "priority")
+
+class GoalRecord:
+    __slots__ = ("name", "target_amount", "current_amount", "deadline", "priority",
+                 "months_left", "required_monthly", "extra")
+
+    def __init__(self, name, target_amount, current_amount, deadline, priority,
+                 months_left, required_monthly, extra=None):
+        self.name = name
+        self.target_amount = target_amount
+        self.current_amount = current_amount
+        self.deadline = deadline
+        self.priority = priority
+        self.months_left = months_left
+        self.required_monthly = required_monthly
+        self.extra = extra or {}
+
+    def as_dict(self):
+        row = {field: getattr(self, field) for field in GOAL_FIELDS}
+        row.update(self.extra)
+        row["months_left"] = self.months_left
+        row["required_monthly"] = self.required_monthly
+        return row
+
+    def __repr__(self):
+        return f"GoalRecord({self.name!r}, priority={self.priority}, months_left={self.months_left})"
+
+
+def parse_deadline(value):
+    """Deadline as a datetime: accepts datetimes, dates, Timestamps and ISO strings."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        import pandas as pd  # unusual formats only
+        return pd.to_datetime(value).to_pydatetime()
+
+
+def months_between(deadline, as_of):
+    """Scalar months_until: whole months from as_of to deadline, truncated toward zero."""
+    months = (deadline.year - as_of.year) * 12 + (deadline.month - as_of.month)
+    shifted_day = min(as_of.day, calendar.monthrange(deadline.year, deadline.month)[1])
+    deadline_key = (deadline.day, deadline.time())
+    as_of_key = (shifted_day, as_of.time())
+    if deadline >= as_of:
+        if deadline_key < as_of_key:
+            months -= 1
+    elif deadline_key > as_of_key:
+        months += 1
+    return months
+
+
+def build_records(goals, as_of=None):
+    """get_goals_dataframe equivalent: list of GoalRecord in input order."""
+    as_of = parse_deadline(as_of) if as_of is not None else TODAY
+    records = []
+    for goal in goals:
+        deadline = parse_deadline(goal["deadline"])
+        months_left = max(1, months_between(deadline, as_of))
+        required = max(0.0, (goal["target_amount"] - goal["current_amount"]) / months_left)
+        extra = {k: v for k, v in goal.items() if k not in GOAL_FIELDS and k not in ("months_left", "required_monthly")}
+        records.append(GoalRecord(goal["name"], goal["target_amount"], goal["current_amount"], deadline,
+                                  goal["priority"], months_left, required, extra))
+    return records
+
+
+def plan_records(records, monthly_savings, mode="greedy"):
+    """plan_allocations equivalent on GoalRecords; returns (allocations, reason_tags)."""
+    ordered = sorted(records, key=lambda r: (-r.priority, r.months_left))
+    allocations = {}
+    reason_tags = []
+    if mode == "weighted":
+        if monthly_savings <= 0:
+            return {r.name: 0.0 for r in ordered}, []
+        amounts = planning_engine.water_fill_allocations([r.required_monthly for r in ordered],
+                                                         [max(r.priority, 1) for r in ordered],
+                                                         monthly_savings).tolist()
+        for r, alloc in zip(ordered, amounts):
+            allocations[r.name] = alloc
+            tag = planning_engine.reason_tag(r.priority, r.months_left, r.required_monthly, alloc)
+            reason_tags.append({"goal": r.name, "tag": tag, "allocate": alloc, "months_left": int(r.months_left)})
+        return allocations, reason_tags
+    if mode != "greedy":
+        raise ValueError(f"Unknown planning mode: {mode!r} (expected one of {planning_engine.PLANNING_MODES})")
+    savings_left = monthly_savings
+    for r in ordered:
+        if savings_left <= 0:
+            allocations[r.name] = 0.0
+            continue
+        req = r.required_monthly
+        alloc = min(savings_left, max(0, req))
+        allocations[r.name] = alloc
+        savings_left -= alloc
+        tag = planning_engine.reason_tag(r.priority, r.months_left, req, alloc)
+        reason_tags.append({"goal": r.name, "tag": tag, "allocate": alloc, "months_left": int(r.months_left)})
+    return allocations, reason_tags
+
+
+def to_dataframe(records):
+    """Goals DataFrame in get_goals_dataframe's shape (deadline as datetime64)."""
+    import pandas as pd
+    df = pd.DataFrame([r.as_dict() for r in records])
+    if not df.empty:
+        df["deadline"] = pd.to_datetime(df["deadline"])
+    return df
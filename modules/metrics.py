@@ -0,0 +1,114 @@
+"""
+Module 11: Performance Metrics
+
+- Times named stages of an app rerun (profile load, planning, charts, saves...).
+- Keeps a rolling window of durations per stage in an in-process registry
+  and reports count / mean / p50 / p90 / p99 / max.
+- Periodically dumps the summary as JSON for offline analysis.
+- Disabled by default (FINAI_METRICS=1 to enable); when disabled, timed()
+  returns a shared no-op context manager, so the cost is one attribute check.
+"""
+
+import os
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+WINDOW = 500  # most recent samples kept per stage
+DUMP_PATH = os.environ.get("FINAI_METRICS_DUMP", "")  # e.g. data/metrics.json
+DUMP_INTERVAL_SECONDS = float(os.environ.get("FINAI_METRICS_DUMP_INTERVAL", "60"))
+
+enabled = os.environ.get("FINAI_METRICS") == "1"
+
+_NULL = nullcontext()
+_samples = {}
+_lock = threading.Lock()
+_last_dump = time.monotonic()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def record(stage, seconds):
+    """Add one duration sample for stage (ignored while disabled)."""
+    if not enabled:
+        return
+    with _lock:
+        window = _samples.get(stage)
+        if window is None:
+            window = _samples[stage] = deque(maxlen=WINDOW)
+        window.append(seconds)
+
+
+@contextmanager
+def _timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """Context manager timing the enclosed block as one sample of stage."""
+    return _timer(stage) if enabled else _NULL
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summary():
+    """{stage: {count, mean_ms, p50_ms, p90_ms, p99_ms, max_ms, last_ms}} over the rolling window."""
+    with _lock:
+        snapshot = {stage: list(window) for stage, window in _samples.items()}
+    report = {}
+    for stage, values in snapshot.items():
+        if not values:
+            continue
+        ordered = sorted(values)
+        report[stage] = {
+            "count": len(values),
+            "mean_ms": 1000 * sum(values) / len(values),
+            "p50_ms": 1000 * _percentile(ordered, 0.50),
+            "p90_ms": 1000 * _percentile(ordered, 0.90),
+            "p99_ms": 1000 * _percentile(ordered, 0.99),
+            "max_ms": 1000 * ordered[-1],
+            "last_ms": 1000 * values[-1],
+        }
+    return report
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def dump(path):
+    """Write the summary (with a wall-clock timestamp) to path as JSON, atomically."""
+    payload = {"timestamp": time.time(), "stages": summary()}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def maybe_dump(path=None, interval=None):
+    """Dump to path (default DUMP_PATH) if interval seconds have passed since the last dump."""
+    global _last_dump
+    path = path or DUMP_PATH
+    if not enabled or not path:
+        return False
+    now = time.monotonic()
+    with _lock:
+        if now - _last_dump < (DUMP_INTERVAL_SECONDS if interval is None else interval):
+            return False
+        _last_dump = now
+    dump(path)
+    return True
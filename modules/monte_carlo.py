@@ -0,0 +1,107 @@
+"""
+Module 6: Monte Carlo Outcome Simulation
+
+- Simulates market-return and savings (income) paths for each risk profile.
+- Applies the planning heuristic along every path, month by month.
+- Reports the probability of each goal reaching its target by its deadline.
+- Paths are generated as NumPy blocks, each with its own child seed, and the
+  blocks are spread over a process pool; results do not depend on worker count.
+- Addresses research gap: Risk-aware, goal-oriented planning.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Annualised expected return / volatility of goal balances per risk profile
+RISK_PROFILES = {
+    "Low": {"annual_return": 0.03, "annual_volatility": 0.04},
+    "Medium": {"annual_return": 0.06, "annual_volatility": 0.10},
+    "High": {"annual_return": 0.09, "annual_volatility": 0.18},
+}
+SAVINGS_VOLATILITY = 0.10  # month-to-month noise on income - expenses
+DEFAULT_PATHS = 10000
+BLOCK_SIZE = 2500
+
+
+def _monthly_growth(rng, profile, months, n_paths):
+    """Lognormal monthly growth factors, shape (months, n_paths)."""
+    params = RISK_PROFILES[profile]
+    sigma = params["annual_volatility"] / np.sqrt(12)
+    mu = np.log1p(params["annual_return"]) / 12 - sigma ** 2 / 2
+    return np.exp(mu + sigma * rng.standard_normal((months, n_paths)))
+
+
+def _simulate_block(args):
+    """Simulate one block of paths; returns per-goal success counts."""
+    seed, n_paths, profile, monthly_savings, target, current, months_left, orders = args
+    rng = np.random.default_rng(seed)
+    months = len(orders)
+    growth = _monthly_growth(rng, profile, months, n_paths)
+    savings = monthly_savings * np.exp(
+        SAVINGS_VOLATILITY * rng.standard_normal((months, n_paths)) - SAVINGS_VOLATILITY ** 2 / 2
+    )
+
+    balance = np.tile(current, (n_paths, 1))
+    success = np.zeros(len(target), dtype=np.int64)
+    for month, order in enumerate(orders):
+        balance *= growth[month][:, None]
+        remaining = np.maximum(0, target - balance)
+        need = remaining[:, order] / np.maximum(1, months_left[order] - month)
+        spent_before = np.cumsum(need, axis=1) - need
+        alloc = np.clip(savings[month][:, None] - spent_before, 0, need)
+        balance[:, order] += alloc
+        due = months_left == month + 1
+        if due.any():
+            success[due] += (balance[:, due] >= target[due] - 1e-6).sum(axis=0)
+    return success
+
+
+def simulate_goal_success(goals_df, monthly_savings, risk_profile="Medium",
+                          n_paths=DEFAULT_PATHS, seed=0, workers=None, block_size=BLOCK_SIZE):
+    """
+    Probability of each goal meeting target_amount by its deadline.
+    - goals_df: output of get_goals_dataframe (one user's goals).
+    - Each month, balances grow by the profile's random return, then the
+      month's (noisy) savings are allocated in plan_allocations order.
+    - workers: process count (None = all cores, 1 = run in-process).
+    Returns: {goal_name: probability}
+    """
+    names = list(goals_df["name"])
+    target = goals_df["target_amount"].to_numpy(dtype=float)
+    current = goals_df["current_amount"].to_numpy(dtype=float)
+    priority = goals_df["priority"].to_numpy()
+    months_left = np.maximum(1, goals_df["months_left"].to_numpy(dtype=np.int64))
+    position = np.arange(len(names))
+
+    # The allocation order depends only on the month, not on the path
+    orders = [
+        np.lexsort((position, np.maximum(1, months_left - month), -priority))
+        for month in range(int(months_left.max()) if len(names) else 0)
+    ]
+
+    n_blocks = -(-n_paths // block_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    sizes = [min(block_size, n_paths - i * block_size) for i in range(n_blocks)]
+    tasks = [
+        (s, n, risk_profile, float(monthly_savings), target, current, months_left, orders)
+        for s, n in zip(seeds, sizes)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, n_blocks)
+    if workers <= 1:
+        counts = [_simulate_block(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = list(pool.map(_simulate_block, tasks))
+
+    success = np.sum(counts, axis=0) if counts else np.zeros(len(names))
+    return {name: float(p) for name, p in zip(names, success / max(n_paths, 1))}
+
+
+def compare_risk_profiles(goals_df, monthly_savings, **kwargs):
+    """Run simulate_goal_success for every risk profile: {profile: {goal: probability}}."""
+    return {
+        profile: simulate_goal_success(goals_df, monthly_savings, profile, **kwargs)
+        for profile in RISK_PROFILES
+    }
@@ -0,0 +1,389 @@
+"""
+Module 13: Email Notification Queue
+
+- Queues outgoing emails in a durable on-disk outbox (one JSON file per
+  message) and returns immediately; a pool of worker threads delivers them.
+- Each worker keeps its own SMTP connection open across messages and sends
+  in batches, reconnecting after errors and closing it when idle.
+- Failed sends are retried with exponential backoff; after MAX_ATTEMPTS the
+  message is moved to outbox/failed/. Undelivered messages survive restarts.
+- Without FINAI_SMTP_HOST, a MemoryTransport stands in for the SMTP server
+  (it logs messages, keeps the most recent SENT_KEPT and can inject failures
+  for testing).
+
+Usage:
+    python -m modules.notifications drain      # deliver everything in the outbox, then exit
+"""
+
+import os
+import json
+import heapq
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+OUTBOX_DIR = os.environ.get("FINAI_OUTBOX", os.path.join("data", "outbox"))
+SMTP_HOST = os.environ.get("FINAI_SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("FINAI_SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("FINAI_SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("FINAI_SMTP_PASSWORD", "")
+SMTP_SENDER = os.environ.get("FINAI_SMTP_SENDER", SMTP_USER or "finai@localhost")
+SMTP_STARTTLS = os.environ.get("FINAI_SMTP_STARTTLS", "1") == "1"
+
+WORKERS = 2
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 300.0
+IDLE_SECONDS = 10.0  # close a worker's SMTP connection after this long without work
+CLAIM_TIMEOUT_SECONDS = 600.0  # in-flight files older than this are assumed orphaned
+SENT_KEPT = 1000  # messages MemoryTransport remembers; older ones are dropped
+MESSAGE_FIELDS = ("id", "to", "subject", "body", "attempts")
+
+MESSAGE_SUFFIX = ".json"
+CLAIM_SUFFIX = ".sending"
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPTransport:
+    """One reusable SMTP connection (not thread-safe: one per worker)."""
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD,
+                 sender=SMTP_SENDER, starttls=SMTP_STARTTLS, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        import smtplib  # only loaded when real SMTP is configured
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def send(self, message):
+        import smtplib
+        from email.mime.text import MIMEText
+        if self._server is None:
+            self._server = self._connect()
+        msg = MIMEText(message["body"])
+        msg["Subject"] = message["subject"]
+        msg["From"] = self.sender
+        msg["To"] = message["to"]
+        try:
+            self._server.sendmail(self.sender, [message["to"]], msg.as_string())
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self._server = None  # reconnect on the next send
+            raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+class MemoryTransport:
+    """
+    In-process SMTP stand-in: logs delivered messages and keeps the last
+    ``sent_kept`` of them in .sent. Calling it returns itself, so one
+    instance can serve as the transport factory for every worker. The first
+    ``failures`` sends raise ConnectionError.
+    """
+
+    def __init__(self, failures=0, sent_kept=SENT_KEPT):
+        self.sent = deque(maxlen=sent_kept)
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self  # usable directly as a transport factory
+
+    def send(self, message):
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("simulated failure")
+            self.sent.append(message)
+        logger.info("Simulated email sent to %s: %s", message["to"], message["subject"])
+
+    def close(self):
+        pass
+
+
+def default_transport_factory():
+    """SMTP when FINAI_SMTP_HOST is set, otherwise the in-process stand-in."""
+    if SMTP_HOST:
+        return SMTPTransport
+    return MemoryTransport()
+
+
+class EmailQueue:
+    """Durable outbox plus a pool of delivery threads."""
+
+    def __init__(self, outbox_dir=OUTBOX_DIR, transport_factory=None, workers=WORKERS,
+                 batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS,
+                 backoff_base=BACKOFF_BASE_SECONDS, backoff_max=BACKOFF_MAX_SECONDS):
+        self.outbox_dir = outbox_dir
+        self.failed_dir = os.path.join(outbox_dir, "failed")
+        self.transport_factory = transport_factory or default_transport_factory()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0}
+        self._ready = deque()
+        self._delayed = []  # heap of (due time, message id)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        os.makedirs(self.failed_dir, exist_ok=True)
+
+    # --- outbox files ---
+
+    def _path(self, msg_id):
+        return os.path.join(self.outbox_dir, msg_id + MESSAGE_SUFFIX)
+
+    def _write(self, path, message):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(message, f)
+        os.replace(tmp, path)
+
+    def _recover(self):
+        """Queue messages left in the outbox by earlier runs (and orphaned claims)."""
+        now = time.time()
+        queued = set(self._ready)
+        for fname in os.listdir(self.outbox_dir):
+            path = os.path.join(self.outbox_dir, fname)
+            if fname.endswith(CLAIM_SUFFIX):
+                if now - os.path.getmtime(path) < CLAIM_TIMEOUT_SECONDS:
+                    continue
+                fname = fname[:-len(CLAIM_SUFFIX)]
+                try:
+                    os.replace(path, os.path.join(self.outbox_dir, fname))
+                except OSError:
+                    continue
+            if fname.endswith(MESSAGE_SUFFIX) and fname[:-len(MESSAGE_SUFFIX)] not in queued:
+                heapq.heappush(self._delayed, (0.0, fname[:-len(MESSAGE_SUFFIX)]))
+
+    # --- producer side ---
+
+    def enqueue(self, to, subject, body):
+        """Persist one message to the outbox and return its id without waiting for delivery."""
+        return self.enqueue_many([(to, subject, body)])[0]
+
+    def enqueue_many(self, messages):
+        """Persist (to, subject, body) tuples and queue them; returns their ids."""
+        ids = []
+        now = time.time()
+        for to, subject, body in messages:
+            msg_id = f"{int(now * 1000):013d}-{uuid.uuid4().hex[:12]}"
+            self._write(self._path(msg_id), {
+                "id": msg_id, "to": to, "subject": subject, "body": body,
+                "attempts": 0, "created": now, "last_error": None,
+            })
+            ids.append(msg_id)
+        with self._cond:
+            self._ready.extend(ids)
+            self.stats["queued"] += len(ids)
+            self._cond.notify_all()
+        return ids
+
+    def pending(self):
+        """Messages queued, waiting for a retry or being sent."""
+        with self._cond:
+            return len(self._ready) + len(self._delayed) + self._in_flight
+
+    # --- workers ---
+
+    def start(self):
+        if self._threads:
+            return self
+        with self._cond:
+            self._stopping = False
+            self._recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the workers after their current batch; queued messages stay in the outbox."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def flush(self, timeout=None):
+        """Wait until nothing is pending; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._ready) + len(self._delayed) + self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.05 if remaining is None else min(0.05, remaining))
+        return True
+
+    def _next_batch(self):
+        """Up to batch_size due message ids; [] after IDLE_SECONDS without work or on stop."""
+        idle_until = time.monotonic() + IDLE_SECONDS
+        with self._cond:
+            while not self._stopping:
+                now = time.time()
+                batch = []
+                while self._delayed and self._delayed[0][0] <= now and len(batch) < self.batch_size:
+                    batch.append(heapq.heappop(self._delayed)[1])
+                while self._ready and len(batch) < self.batch_size:
+                    batch.append(self._ready.popleft())
+                if batch:
+                    self._in_flight += len(batch)
+                    return batch
+                wait = idle_until - time.monotonic()
+                if wait <= 0:
+                    return []
+                if self._delayed:
+                    wait = min(wait, self._delayed[0][0] - now)
+                self._cond.wait(max(wait, 0.01))
+        return []
+
+    def _run(self):
+        transport = self.transport_factory()
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    transport.close()  # idle: don't hold the connection open
+                    with self._cond:
+                        if self._stopping:
+                            return
+                    continue
+                for msg_id in batch:
+                    try:
+                        self._deliver(transport, msg_id)
+                    except Exception:
+                        # Never let one message take the worker down; put it back and retry later
+                        logger.exception("Email worker failed on message %s", msg_id)
+                        self._release(msg_id)
+                    finally:
+                        with self._cond:
+                            self._in_flight -= 1
+                            self._cond.notify_all()
+        finally:
+            transport.close()
+
+    def _deliver(self, transport, msg_id):
+        path = self._path(msg_id)
+        claimed = path + CLAIM_SUFFIX
+        try:
+            os.replace(path, claimed)  # claim it so another process can't send it too
+        except FileNotFoundError:
+            return
+        try:
+            with open(claimed) as f:
+                message = json.load(f)
+            if not isinstance(message, dict):
+                raise ValueError("outbox file does not hold a JSON object")
+            missing = [field for field in MESSAGE_FIELDS if field not in message]
+            if missing:
+                raise ValueError(f"outbox message is missing {', '.join(missing)}")
+        except (OSError, ValueError) as exc:
+            self._quarantine(msg_id, claimed, exc)
+            return
+        try:
+            transport.send(message)
+        except Exception as exc:
+            self._retry_later(message, claimed, exc)
+            return
+        os.remove(claimed)
+        with self._cond:
+            self.stats["sent"] += 1
+
+    def _release(self, msg_id):
+        """Return a claimed message to the outbox after an unexpected error and schedule a retry."""
+        path = self._path(msg_id)
+        try:
+            os.replace(path + CLAIM_SUFFIX, path)
+        except OSError:
+            if not os.path.exists(path):
+                return  # already sent, moved to failed/ or gone
+        with self._cond:
+            heapq.heappush(self._delayed, (time.time() + self.backoff_max, msg_id))
+            self._cond.notify_all()
+
+    def _quarantine(self, msg_id, claimed, exc):
+        """Move an unreadable outbox file to failed/ as-is."""
+        logger.warning("Unreadable email %s moved to %s: %s", msg_id, self.failed_dir, exc)
+        try:
+            os.replace(claimed, os.path.join(self.failed_dir, msg_id + MESSAGE_SUFFIX))
+        except OSError:
+            pass
+        with self._cond:
+            self.stats["failed"] += 1
+
+    def _retry_later(self, message, claimed, exc):
+        message["attempts"] += 1
+        message["last_error"] = f"{type(exc).__name__}: {exc}"
+        if message["attempts"] >= self.max_attempts:
+            self._write(os.path.join(self.failed_dir, message["id"] + MESSAGE_SUFFIX), message)
+            os.remove(claimed)
+            logger.warning("Giving up on email %s to %s: %s", message["id"], message["to"], message["last_error"])
+            with self._cond:
+                self.stats["failed"] += 1
+            return
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (message["attempts"] - 1))
+        delay *= random.uniform(0.8, 1.2)  # jitter so a recovering server isn't hit in lockstep
+        self._write(self._path(message["id"]), message)
+        os.remove(claimed)
+        with self._cond:
+            heapq.heappush(self._delayed, (time.time() + delay, message["id"]))
+            self.stats["retried"] += 1
+            self._cond.notify_all()
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_queue():
+    """Process-wide queue, started on first use (shared by all Streamlit sessions)."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = EmailQueue().start()
+        return _default_queue
+
+
+def send_email(to_email, subject, body):
+    """Queue one email for background delivery; returns its outbox id."""
+    return get_queue().enqueue(to_email, subject, body)
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] != ["drain"]:
+        sys.exit("usage: python -m modules.notifications drain")
+    logging.basicConfig(level=logging.INFO)
+    queue = get_queue()
+    queue.flush()
+    queue.stop()
+    print(f"Delivered {queue.stats['sent']} emails, {queue.stats['failed']} failed")
@@ -4,19 +4,31 @@ Module 2: Goal-Based Planning Engine
 - Implements a heuristic, explainable allocation algorithm.
 - Sorts goals by priority and urgency, allocates monthly savings.
 - Outputs allocation dict and reason tags for XAI.
+- Solver modes: "greedy" (fill goals in priority order) or "weighted"
+  (priority-weighted water-filling, capped at each goal's required_monthly).
+- NumPy/pandas are imported inside the functions that use them, so importing
+  this module is cheap for callers that never touch the vectorized paths.
 - Addresses research gap: Dynamic, holistic, goal-oriented planning.
 """
 
-def plan_allocations(goals_df, monthly_savings):
+PLANNING_MODES = ("greedy", "weighted")
+
+def plan_allocations(goals_df, monthly_savings, mode="greedy"):
     """
     Heuristic allocation:
     - Sort by priority (desc), then months_left (asc).
-    - Allocate up to required_monthly for each goal, until savings depleted.
+    - greedy: allocate up to required_monthly for each goal, until savings depleted.
+    - weighted: share savings in proportion to priority, capped at
+      required_monthly (see water_fill_allocations).
     - Tag reasons for each allocation.
     Returns:
         allocations: {goal_name: allocation_amount}
         reason_tags: [{goal, tag, allocate, months_left}]
     """
+    if mode == "weighted":
+        return _plan_weighted(goals_df, monthly_savings)
+    if mode != "greedy":
+        raise ValueError(f"Unknown planning mode: {mode!r} (expected one of {PLANNING_MODES})")
     df = goals_df.copy()
     df = df.sort_values(by=["priority", "months_left"], ascending=[False, True])
     savings_left = monthly_savings
@@ -33,22 +45,162 @@ def plan_allocations(goals_df, monthly_savings):
         savings_left -= alloc
 
         # Tagging logic for XAI
-        tag = []
-        if row["priority"] >= 4:
-            tag.append("HIGH_PRIORITY")
-        if row["months_left"] <= 3:
-            tag.append("DEADLINE_APPROACHING")
-        if alloc >= req and req > 0:
-            tag.append("ON_TRACK")
-        if alloc < req and req > 0:
-            tag.append("UNDERFUNDED")
-        if req == 0:
-            tag.append("GOAL_COMPLETE")
         reason_tags.append({
             "goal": row["name"],
-            "tag": "_".join(tag) if tag else "STANDARD",
+            "tag": reason_tag(row["priority"], row["months_left"], req, alloc),
             "allocate": alloc,
             "months_left": int(row["months_left"])
         })
 
-    return allocations, reason_tags
\ No newline at end of file
+    return allocations, reason_tags
+
+def cap_allocations(need, savings):
+    """
+    Greedy fill of already-sorted needs from savings, without a loop:
+    each goal gets min(need, savings - sum of earlier needs), floored at 0.
+    """
+    import numpy as np
+    spent_before = np.cumsum(need) - need
+    return np.clip(savings - spent_before, 0, need)
+
+
+def water_fill_allocations(need, weight, savings):
+    """
+    Priority-weighted water-filling in O(n log n): every goal gets
+    min(need, level * weight), with one common level chosen so the total equals
+    savings (or every need is met if savings cover them all).
+    """
+    import numpy as np
+    need = np.maximum(0, np.asarray(need, dtype=float))
+    weight = np.asarray(weight, dtype=float)
+    if savings <= 0:
+        return np.zeros_like(need)
+    if savings >= need.sum():
+        return need.copy()
+    # Goals saturate in order of need / weight; find the first one left below its cap
+    ratio = need / weight
+    order = np.argsort(ratio, kind="stable")
+    need_sorted, weight_sorted = need[order], weight[order]
+    capped_before = np.cumsum(need_sorted) - need_sorted
+    weight_from = np.cumsum(weight_sorted[::-1])[::-1]
+    levels = (savings - capped_before) / weight_from
+    level = levels[np.argmax(levels <= ratio[order])]
+    return np.minimum(need, level * weight)
+
+
+def _plan_weighted(goals_df, monthly_savings):
+    """plan_allocations(mode="weighted"): same output structure as greedy."""
+    import numpy as np
+    df = goals_df.sort_values(by=["priority", "months_left"], ascending=[False, True])
+    names = df["name"].tolist()
+    if monthly_savings <= 0:
+        return {name: 0.0 for name in names}, []
+    required = df["required_monthly"].to_numpy(dtype=float)
+    priority = df["priority"].to_numpy()
+    months_left = df["months_left"].to_numpy()
+    allocate = water_fill_allocations(required, np.maximum(priority, 1), monthly_savings)
+    tags = _tag_lookup()[tag_codes(priority, months_left, required, allocate)]
+    allocations = dict(zip(names, allocate.tolist()))
+    reason_tags = [
+        {"goal": name, "tag": tag, "allocate": alloc, "months_left": int(months)}
+        for name, tag, alloc, months in zip(names, tags, allocate.tolist(), months_left)
+    ]
+    return allocations, reason_tags
+
+
+# Reason-tag flags in the order plan_allocations joins them
+_TAG_NAMES = ["HIGH_PRIORITY", "DEADLINE_APPROACHING", "ON_TRACK", "UNDERFUNDED", "GOAL_COMPLETE"]
+_tag_lookup_table = None
+
+
+def _tag_lookup():
+    """Object array mapping every tag bitmask to its joined tag string (built on first use)."""
+    global _tag_lookup_table
+    if _tag_lookup_table is None:
+        import numpy as np
+        _tag_lookup_table = np.array([
+            "_".join(name for bit, name in enumerate(_TAG_NAMES) if code >> bit & 1) or "STANDARD"
+            for code in range(1 << len(_TAG_NAMES))
+        ], dtype=object)
+    return _tag_lookup_table
+
+
+def reason_tag(priority, months_left, required, allocate):
+    """Joined reason tag for one goal (scalar counterpart of tag_codes)."""
+    flags = (
+        priority >= 4,
+        months_left <= 3,
+        allocate >= required and required > 0,
+        allocate < required and required > 0,
+        required == 0,
+    )
+    return "_".join(name for name, flag in zip(_TAG_NAMES, flags) if flag) or "STANDARD"
+
+
+def tag_codes(priority, months_left, required, allocate):
+    """Vectorized reason-tag bitmask (bit i set = _TAG_NAMES[i] applies)."""
+    import numpy as np
+    return (
+        (priority >= 4).astype(np.int64)
+        | (months_left <= 3).astype(np.int64) << 1
+        | ((allocate >= required) & (required > 0)).astype(np.int64) << 2
+        | ((allocate < required) & (required > 0)).astype(np.int64) << 3
+        | (required == 0).astype(np.int64) << 4
+    )
+
+
+def plan_allocations_batch(goals_df, monthly_savings, user_col="user_id"):
+    """
+    Vectorized plan_allocations for many users in one pass.
+    - goals_df: get_goals_dataframe output with a user_col column.
+    - monthly_savings: per-user savings (Series/dict keyed by user, or a scalar).
+    Within each user, goals are ordered by priority (desc), then months_left
+    (asc), and each gets min(savings left, required_monthly), where savings
+    left is the user's savings minus the grouped cumulative sum of earlier needs
+    (same tags as plan_allocations; amounts equal up to float rounding).
+    Returns a DataFrame in planning order with columns:
+        user_col, name, priority, months_left, required_monthly, allocate, tag
+    tag is None for goals reached after savings ran out (plan_allocations
+    allocates 0.0 to them and emits no reason tag).
+    """
+    import numpy as np
+    import pandas as pd
+    df = goals_df.sort_values(by=[user_col, "priority", "months_left"], ascending=[True, False, True])
+    users = df[user_col]
+    if isinstance(monthly_savings, (pd.Series, dict)):
+        savings = users.map(pd.Series(monthly_savings)).fillna(0.0).to_numpy(dtype=float)
+    else:
+        savings = np.full(len(df), float(monthly_savings))
+
+    required = df["required_monthly"].to_numpy(dtype=float)
+    need = pd.Series(np.maximum(0, required), index=df.index)
+    spent_before = need.groupby(users, sort=False).cumsum().groupby(users, sort=False).shift(fill_value=0.0)
+    savings_left = savings - spent_before.to_numpy()
+    tagged = savings_left > 0
+    allocate = np.where(tagged, np.minimum(savings_left, need.to_numpy()), 0.0)
+
+    months_left = df["months_left"].to_numpy()
+    codes = tag_codes(df["priority"].to_numpy(), months_left, required, allocate)
+    tags = np.where(tagged, _tag_lookup()[codes], None)
+
+    return pd.DataFrame({
+        user_col: users.to_numpy(),
+        "name": df["name"].to_numpy(),
+        "priority": df["priority"].to_numpy(),
+        "months_left": months_left.astype(np.int64),
+        "required_monthly": required,
+        "allocate": allocate,
+        "tag": tags,
+    }, index=df.index)
+
+
+def batch_results_for_user(plan_df, user, user_col="user_id"):
+    """Convert one user's rows of plan_allocations_batch output to (allocations, reason_tags)."""
+    rows = plan_df[plan_df[user_col] == user]
+    allocations = dict(zip(rows["name"], rows["allocate"].astype(float)))
+    reason_tags = [
+        {"goal": name, "tag": tag, "allocate": float(alloc), "months_left": int(months)}
+        for name, tag, alloc, months in zip(rows["name"], rows["tag"], rows["allocate"], rows["months_left"])
+        if tag is not None
+    ]
+    return allocations, reason_tags
@@ -0,0 +1,309 @@
+"""
+Module 19: Progress Analytics (incremental)
+
+- Rolling per-user aggregates kept in data/<user>_progress.json together
+  with cursors into the goal history (modules/goal_history.py) and the
+  activity log, so each update folds in only the entries written since the
+  last one: O(1) work per new entry, never a rescan of the full history.
+- Per goal: net contributions (allocations and manual current_amount
+  changes) in monthly buckets, plus the baseline a linear "projected"
+  path to the deadline starts from (reset when target or deadline change).
+- Per profile: income / expenses from "Updated profile" activity entries,
+  as monthly values and running least-squares sums for a trend line.
+- summary() turns the aggregates into contribution rates, projected vs
+  actual progress and income / expenses trends.
+"""
+
+import os
+import re
+import json
+import threading
+from datetime import datetime
+
+from modules import activity_log, goal_history
+
+PROGRESS_DIR = "data"
+PROGRESS_SUFFIX = "_progress.json"
+MONTHS_KEPT = 24  # monthly buckets kept per goal / profile; older months stay in the totals
+RATE_WINDOW_MONTHS = 3
+
+_PROFILE_ACTION = "Updated profile"
+_PROFILE_PATTERN = re.compile(r"Income: \D*([\d.]+), Expenses: \D*([\d.]+)")
+_STAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_states = {}  # (progress dir, user) -> state, reused across reruns
+_user_locks = {}  # (progress dir, user) -> lock; one user's update never waits on another's I/O
+_lock = threading.Lock()  # guards _user_locks only
+
+
+def _path(username, progress_dir=None):
+    return os.path.join(progress_dir or PROGRESS_DIR, f"{username}{PROGRESS_SUFFIX}")
+
+
+def _empty_state():
+    return {
+        "history_offset": 0,
+        "activity": {"inode": None, "offset": 0, "last_ts": "", "seen_at_last_ts": 0},
+        "goals": [],
+        "profile": {"count": 0, "first_ts": None, "last_ts": None, "income": None, "expenses": None,
+                    "months": {}, "fit": {"x0": None, "n": 0, "sx": 0.0, "sxx": 0.0,
+                                          "s_income": 0.0, "sx_income": 0.0, "s_expenses": 0.0, "sx_expenses": 0.0}},
+    }
+
+
+def _month_index(ts):
+    """Fractional months since year 0 for a "YYYY-MM-DD HH:MM:SS" stamp."""
+    return int(ts[:4]) * 12 + int(ts[5:7]) - 1 + (int(ts[8:10]) - 1) / 31.0
+
+
+def _bump_month(months, key, value, add=True):
+    """Set or add to one monthly bucket, dropping the oldest beyond MONTHS_KEPT."""
+    months[key] = months.get(key, 0.0) + value if add else value
+    if len(months) > MONTHS_KEPT:
+        del months[min(months)]
+
+
+# --- folding in goal events ---
+
+def _new_goal(goal, ts):
+    return {
+        "name": goal["name"], "current": float(goal.get("current_amount", 0.0)),
+        "target": float(goal.get("target_amount", 0.0)), "deadline": str(goal.get("deadline", ""))[:10],
+        "base_ts": ts, "base_amount": float(goal.get("current_amount", 0.0)),
+        "contributed": 0.0, "first_ts": None, "last_ts": None, "completed": False, "months": {},
+    }
+
+
+def _contribute(goal, amount, ts):
+    goal["contributed"] += amount
+    goal["first_ts"] = goal["first_ts"] or ts
+    goal["last_ts"] = ts
+    _bump_month(goal["months"], ts[:7], amount)
+
+
+def apply_goal_event(state, event):
+    """Fold one goal_history event into the per-goal aggregates."""
+    goals, ts, fields = state["goals"], event["ts"], event["fields"]
+    kind = event["type"]
+    if kind == "add":
+        goals.append(_new_goal(fields, ts))
+        return
+    index = event["index"]
+    if not 0 <= index < len(goals):
+        return
+    goal = goals[index]
+    if kind == "complete":
+        goal["completed"] = True
+        return
+    goal["name"] = fields.get("name", goal["name"])
+    if "current_amount" in fields:
+        new = float(fields["current_amount"])
+        _contribute(goal, new - goal["current"], ts)
+        goal["current"] = new
+    if "target_amount" in fields or "deadline" in fields:
+        goal["target"] = float(fields.get("target_amount", goal["target"]))
+        goal["deadline"] = str(fields.get("deadline", goal["deadline"]))[:10]
+        goal["base_ts"], goal["base_amount"] = ts, goal["current"]  # re-plan from here
+
+
+# --- folding in activity entries ---
+
+def apply_profile_entry(state, entry):
+    """Fold one "Updated profile" activity entry into the income / expenses aggregates."""
+    match = _PROFILE_PATTERN.search(entry.get("details") or "")
+    if not match:
+        return
+    income, expenses = float(match.group(1)), float(match.group(2))
+    ts = entry["timestamp"][:19]
+    profile = state["profile"]
+    profile["count"] += 1
+    profile["first_ts"] = profile["first_ts"] or ts
+    profile["last_ts"] = ts
+    profile["income"], profile["expenses"] = income, expenses
+    _bump_month(profile["months"], ts[:7], [income, expenses], add=False)
+    fit = profile["fit"]
+    if fit["x0"] is None:
+        fit["x0"] = _month_index(ts)
+    x = _month_index(ts) - fit["x0"]
+    fit["n"] += 1
+    fit["sx"] += x
+    fit["sxx"] += x * x
+    fit["s_income"] += income
+    fit["sx_income"] += x * income
+    fit["s_expenses"] += expenses
+    fit["sx_expenses"] += x * expenses
+
+
+def _new_activity(username, cursor, log_dir=None):
+    """Activity entries written after cursor (updated in place), oldest first."""
+    activity_log.migrate_legacy_log(username, log_dir)
+    log_path = activity_log.get_log_path(username, log_dir)
+    try:
+        st = os.stat(log_path)
+        inode, size = st.st_ino, st.st_size
+    except OSError:
+        inode, size = None, 0
+    rotated = cursor["inode"] != inode or size < cursor["offset"]
+    if not rotated:
+        start, entries = cursor["offset"], []
+    else:
+        # Rotated since the last update: entries we had not read yet moved into
+        # archived months, so read only months from the last one seen on
+        start, entries = 0, []
+        first_month = cursor["last_ts"][:7]
+        for month in activity_log.list_segments(username, log_dir):
+            if month >= first_month:
+                entries.extend(activity_log.read_segment(username, month, log_dir))
+    if size > start:
+        with open(log_path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(size - start)
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        cursor["offset"] = start + len(chunk)
+        for line in chunk.splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # torn write from a crashed appender
+    else:
+        cursor["offset"] = start
+    cursor["inode"] = inode
+    fresh, skip = [], cursor["seen_at_last_ts"] if rotated else 0
+    for entry in entries:
+        ts = str(entry.get("timestamp", ""))[:19]
+        if rotated and ts < cursor["last_ts"]:
+            continue
+        if ts == cursor["last_ts"] and skip > 0:
+            skip -= 1  # already folded in before the rotation
+            continue
+        fresh.append(entry)
+        if ts == cursor["last_ts"]:
+            cursor["seen_at_last_ts"] += 1
+        else:
+            cursor["last_ts"], cursor["seen_at_last_ts"] = ts, 1
+    return fresh
+
+
+# --- state ---
+
+def load_state(username, progress_dir=None):
+    try:
+        with open(_path(username, progress_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty_state()
+
+
+def save_state(username, state, progress_dir=None):
+    path = _path(username, progress_dir)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _user_lock(key):
+    with _lock:
+        lock = _user_locks.get(key)
+        if lock is None:
+            lock = _user_locks[key] = threading.Lock()
+        return lock
+
+
+def update(username, log_dir=None, history_dir=None, progress_dir=None):
+    """Fold in goal events and activity written since the last update; returns the state."""
+    key = (progress_dir or PROGRESS_DIR, username)
+    with _user_lock(key):
+        state = _states.get(key) or load_state(username, progress_dir)
+        cursor = dict(state["activity"], history_offset=state["history_offset"])
+        changed = False
+        if state["history_offset"] == 0 and not state["goals"]:
+            initial = goal_history.initial_state(username, history_dir)
+            if initial is not None:
+                ts, goals = initial
+                state["goals"] = [_new_goal(goal, ts) for goal in goals["goals"]]
+                completed = set(goals["completed_goals"])
+                for goal in state["goals"]:
+                    goal["completed"] = goal["name"] in completed
+                changed = True
+        events, offset = goal_history.read_events(username, state["history_offset"], history_dir)
+        for event in events:
+            apply_goal_event(state, event)
+        for entry in _new_activity(username, state["activity"], log_dir):
+            if entry.get("action") == _PROFILE_ACTION:
+                apply_profile_entry(state, entry)
+        state["history_offset"] = offset
+        changed = changed or cursor != dict(state["activity"], history_offset=offset)
+        if changed:
+            save_state(username, state, progress_dir)
+        _states[key] = state
+        return state
+
+
+# --- reporting ---
+
+def _stamp(value=None):
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, datetime):
+        return value.strftime(_STAMP_FORMAT)
+    value = str(value)
+    return value if len(value) > 10 else f"{value} 23:59:59"  # a bare date means end of that day
+
+
+def _months_between(start, end):
+    return _month_index(end) - _month_index(start)
+
+
+def _slope(fit, field):
+    n, sx, sxx = fit["n"], fit["sx"], fit["sxx"]
+    denominator = n * sxx - sx * sx
+    if n < 2 or denominator <= 1e-9:
+        return None
+    return (n * fit[f"sx_{field}"] - sx * fit[f"s_{field}"]) / denominator
+
+
+def summary(state, as_of=None, window=RATE_WINDOW_MONTHS):
+    """
+    Dashboard numbers from the aggregates (cost independent of history length):
+    - goals: per goal contribution_rate (net per month over the last `window`
+      months), total contributed, projected vs actual amount now
+    - profile: latest income / expenses / savings rate and their trend per month
+    """
+    now = _stamp(as_of)
+    recent = {f"{(m // 12):04d}-{(m % 12) + 1:02d}" for m in
+              range(int(_month_index(now)) - window + 1, int(_month_index(now)) + 1)}
+    goals = []
+    for goal in state["goals"]:
+        deadline = f"{goal['deadline']} 23:59:59"
+        span = _months_between(goal["base_ts"], deadline) if goal["deadline"] else 0
+        elapsed = _months_between(goal["base_ts"], now)
+        share = 1.0 if span <= 0 else min(1.0, max(0.0, elapsed / span))
+        projected = goal["base_amount"] + (goal["target"] - goal["base_amount"]) * share
+        goals.append({
+            "goal": goal["name"],
+            "completed": goal["completed"],
+            "contribution_rate": sum(v for k, v in goal["months"].items() if k in recent) / window,
+            "contributed": goal["contributed"],
+            "last_contribution": goal["last_ts"],
+            "projected_amount": projected,
+            "actual_amount": goal["current"],
+            "target_amount": goal["target"],
+            "ahead_by": goal["current"] - projected,
+        })
+    profile = state["profile"]
+    income, expenses = profile["income"], profile["expenses"]
+    return {
+        "goals": goals,
+        "profile": {
+            "updates": profile["count"],
+            "income": income,
+            "expenses": expenses,
+            "savings_rate": (income - expenses) / income if income else None,
+            "income_trend": _slope(profile["fit"], "income"),
+            "expenses_trend": _slope(profile["fit"], "expenses"),
+            "since": profile["first_ts"],
+        },
+    }
@@ -0,0 +1,67 @@
+"""
+Module 5: Projection Engine
+
+- Rolls the planning heuristic forward month by month, in the same solver
+  mode ("greedy" or "weighted") as the plan it projects.
+- Goals that finish stop drawing savings, freeing them for the rest.
+- Outputs a per-month allocation matrix and a completion month per goal.
+- Addresses research gap: Forward-looking, goal-oriented planning ("when will I get there?").
+"""
+
+import numpy as np
+import pandas as pd
+from modules.planning_engine import PLANNING_MODES, cap_allocations, water_fill_allocations
+
+DEFAULT_HORIZON_MONTHS = 480  # 40 years
+
+
+def project_plan(goals_df, monthly_savings, horizon_months=DEFAULT_HORIZON_MONTHS, mode="greedy"):
+    """
+    Simulate plan_allocations(mode=mode) month after month on array-backed state.
+    - goals_df: output of get_goals_dataframe (one user's goals).
+    - Month m re-plans with months_left = max(1, months_left - m) and
+      required_monthly = remaining / months_left, then adds the allocations.
+    - Stops once every goal is funded or horizon_months is reached.
+    Returns:
+        allocations: DataFrame (index: month 1..M, columns: goal names)
+        completion: Series {goal_name: month funded, NaN if not within horizon}
+    Goals already funded today complete in month 0.
+    """
+    if mode not in PLANNING_MODES:
+        raise ValueError(f"Unknown planning mode: {mode!r} (expected one of {PLANNING_MODES})")
+    names = list(goals_df["name"])
+    target = goals_df["target_amount"].to_numpy(dtype=float)
+    current = goals_df["current_amount"].to_numpy(dtype=float).copy()
+    priority = goals_df["priority"].to_numpy()
+    months_left0 = goals_df["months_left"].to_numpy(dtype=np.int64)
+    position = np.arange(len(names))
+
+    completion = np.full(len(names), np.nan)
+    completion[current >= target] = 0
+    rows = np.zeros((horizon_months, len(names)))
+
+    month = 0
+    while month < horizon_months and np.isnan(completion).any():
+        months_left = np.maximum(1, months_left0 - month)
+        need = np.maximum(0, target - current) / months_left
+        if mode == "weighted":
+            alloc = water_fill_allocations(need, np.maximum(priority, 1), monthly_savings)
+        else:
+            # Same order as plan_allocations: priority desc, months_left asc, then input order
+            order = np.lexsort((position, months_left, -priority))
+            alloc = np.zeros(len(names))
+            alloc[order] = cap_allocations(need[order], monthly_savings)
+        current += alloc
+        rows[month] = alloc
+        month += 1
+        done = np.isnan(completion) & (current >= target - 1e-6)
+        completion[done] = month
+
+    allocations = pd.DataFrame(rows[:month], columns=names, index=pd.RangeIndex(1, month + 1, name="month"))
+    return allocations, pd.Series(completion, index=names, name="completion_month")
+
+
+def completion_dates(completion, as_of):
+    """Map completion month offsets to calendar dates (NaT where not completed)."""
+    as_of = pd.Timestamp(as_of)
+    return completion.map(lambda m: pd.NaT if pd.isna(m) else as_of + pd.DateOffset(months=int(m)))
@@ -0,0 +1,254 @@
+"""
+Module 14: Deadline Reminders
+
+- Cross-user index of goal deadlines kept as a priority queue of reminder
+  events ("due soon" LEAD_DAYS before a deadline, "overdue" the day after),
+  so finding what is due pops only the events that fired.
+- Updated incrementally: profile saves call profile_saved(), and sync()
+  re-reads only users whose store version changed since they were indexed.
+- Fired reminders are handed to the email queue (modules/notifications.py);
+  the index and the set of reminders already sent persist between runs.
+
+Usage:
+    python -m modules.reminders              # one pass: sync, send due reminders, deliver
+    python -m modules.reminders --loop 3600  # keep running, one pass per interval
+"""
+
+import os
+import json
+import heapq
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from modules import data_manager, notifications
+
+STATE_PATH = os.path.join("data", "reminders_state.json")
+LEAD_DAYS = 14
+SYNC_SECONDS = 300.0
+DUE_SOON, OVERDUE = "due_soon", "overdue"
+
+SUBJECTS = {
+    DUE_SOON: "Goal deadline approaching: {goal}",
+    OVERDUE: "Goal past its deadline: {goal}",
+}
+BODIES = {
+    DUE_SOON: "Your goal '{goal}' is due on {deadline}. Review your progress in FinAI Advisor.",
+    OVERDUE: "Your goal '{goal}' passed its deadline on {deadline}. Consider updating or completing it in FinAI Advisor.",
+}
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def active_deadlines(data):
+    """{goal name: "YYYY-MM-DD"} for a profile's goals that are not completed."""
+    completed = set(data.get("completed_goals", []))
+    deadlines = {}
+    for goal in data.get("goals", []):
+        if goal.get("name") in completed:
+            continue
+        try:
+            deadlines[goal["name"]] = _to_date(goal["deadline"]).isoformat()
+        except (KeyError, TypeError, ValueError):
+            continue
+    return deadlines
+
+
+def goal_reminders(data, as_of=None, lead_days=LEAD_DAYS):
+    """(kind, goal, deadline) for one profile's overdue and due-soon goals, soonest first."""
+    today = _to_date(as_of or date.today())
+    found = []
+    for goal, deadline in active_deadlines(data).items():
+        days = (date.fromisoformat(deadline) - today).days
+        if days < 0:
+            found.append((OVERDUE, goal, deadline))
+        elif days <= lead_days:
+            found.append((DUE_SOON, goal, deadline))
+    return sorted(found, key=lambda r: r[2])
+
+
+class DeadlineScheduler:
+    """Priority queue of reminder events over every user's goal deadlines."""
+
+    def __init__(self, store=None, state_path=STATE_PATH, lead_days=LEAD_DAYS, email_queue=None):
+        self.store = store or data_manager.get_store()  # the same store the app reads and writes
+        self.state_path = state_path
+        self.lead_days = lead_days
+        self.email_queue = email_queue
+        self._goals = {}     # user -> {goal: deadline}
+        self._emails = {}    # user -> address
+        self._versions = {}  # user -> store version when indexed
+        self._sent = set()   # (user, goal, deadline, kind) already reminded
+        self._heap = []      # (fire date, kind, user, goal, deadline)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._load_state()
+
+    # --- index maintenance ---
+
+    def _push_events(self, username, goal, deadline):
+        due = date.fromisoformat(deadline)
+        for kind, fire in ((DUE_SOON, due - timedelta(days=self.lead_days)), (OVERDUE, due + timedelta(days=1))):
+            if (username, goal, deadline, kind) not in self._sent:
+                heapq.heappush(self._heap, (fire.isoformat(), kind, username, goal, deadline))
+
+    def update_user(self, username, data, version=None):
+        """Re-index one user's goals; only new or moved deadlines get new events."""
+        deadlines = active_deadlines(data) if data else {}
+        with self._lock:
+            old = self._goals.get(username, {})
+            for goal, deadline in deadlines.items():
+                if old.get(goal) != deadline:
+                    self._push_events(username, goal, deadline)
+            if deadlines:
+                self._goals[username] = deadlines
+                self._emails[username] = data.get("email", f"{username}@example.com")
+            else:
+                self._goals.pop(username, None)
+                self._emails.pop(username, None)
+            self._versions[username] = version
+        # Events for removed or moved deadlines stay in the heap and are skipped when popped
+
+    def sync(self):
+        """Re-index users whose store version changed; returns how many were re-read."""
+        changed = 0
+        for username in self.store.list_users():
+            version = self.store.version(username)
+            if version is not None and version == self._versions.get(username):
+                continue
+            self.update_user(username, self.store.get(username), version)
+            changed += 1
+        return changed
+
+    # --- firing ---
+
+    def pop_due(self, as_of=None):
+        """Pop and return every reminder whose event date has arrived, as dicts."""
+        today = _to_date(as_of or date.today()).isoformat()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= today:
+                _, kind, username, goal, deadline = heapq.heappop(self._heap)
+                key = (username, goal, deadline, kind)
+                if self._goals.get(username, {}).get(goal) != deadline or key in self._sent:
+                    continue  # goal edited, completed or removed since the event was queued
+                if kind == DUE_SOON and deadline < today:
+                    self._sent.add(key)  # already overdue: the overdue reminder covers it
+                    continue
+                self._sent.add(key)
+                due.append({"user": username, "email": self._emails[username],
+                            "kind": kind, "goal": goal, "deadline": deadline})
+        return due
+
+    def run_due(self, as_of=None):
+        """Send every due reminder through the email queue; returns the reminders sent."""
+        due = self.pop_due(as_of)
+        if due:
+            queue = self.email_queue or notifications.get_queue()
+            queue.enqueue_many([
+                (r["email"], SUBJECTS[r["kind"]].format(**r), BODIES[r["kind"]].format(**r)) for r in due
+            ])
+        self.save_state()
+        return due
+
+    def run_once(self, as_of=None):
+        self.sync()
+        return self.run_due(as_of)
+
+    # --- persistence ---
+
+    def save_state(self):
+        with self._lock:
+            live = {(u, g, d) for u, goals in self._goals.items() for g, d in goals.items()}
+            self._sent = {key for key in self._sent if key[:3] in live}
+            state = {
+                "goals": self._goals,
+                "emails": self._emails,
+                "versions": self._versions,
+                "sent": sorted(self._sent),
+            }
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._sent = {tuple(key) for key in state.get("sent", [])}
+        self._emails = state.get("emails", {})
+        self._versions = state.get("versions", {})
+        self._goals = state.get("goals", {})
+        for username, goals in self._goals.items():
+            for goal, deadline in goals.items():
+                self._push_events(username, goal, deadline)
+
+    # --- background loop ---
+
+    def start(self, interval=SYNC_SECONDS):
+        """Run sync + run_due every interval seconds in a daemon thread."""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name="deadline-reminders", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self, interval):
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(interval)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(start=True):
+    """Process-wide scheduler (started in the background on first use)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DeadlineScheduler()
+            if start:
+                _scheduler.start()
+        return _scheduler
+
+
+def profile_saved(username, data, version=None):
+    """Hook for profile writers: re-index the user if a scheduler runs in this process."""
+    if _scheduler is not None:
+        _scheduler.update_user(username, data, version)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Send goal deadline reminders for every user.")
+    parser.add_argument("--loop", type=float, help="repeat every LOOP seconds instead of running once")
+    parser.add_argument("--as-of", help="treat this date (YYYY-MM-DD) as today")
+    args = parser.parse_args()
+    scheduler = get_scheduler(start=False)
+    while True:
+        sent = scheduler.run_once(args.as_of)
+        print(f"Queued {len(sent)} reminders")
+        notifications.get_queue().flush()
+        if not args.loop:
+            break
+        time.sleep(args.loop)
@@ -0,0 +1,300 @@
+"""
+Module 7: Profile Storage
+
+- Pluggable per-user profile stores behind one small interface
+  (load / get / save / save_many / save_changes / list_users / version).
+- JsonFileStore: one data/<user>_user.json file per user, atomic writes.
+- SQLiteStore: thread-safe, WAL-mode database with per-user profile and goal
+  rows, pooled connections and transactional upserts.
+- Bulk import of existing data/*_user.json files into any store.
+"""
+
+import os
+import copy
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+USER_SUFFIX = "_user.json"
+PROFILE_FIELDS = ("income", "expenses", "risk_profile")
+GOAL_FIELDS = ("name", "target_amount", "current_amount", "deadline", "priority")
+DERIVED_GOAL_FIELDS = ("months_left", "required_monthly")  # recomputed by get_goals_dataframe
+
+
+class ProfileStore:
+    """Base class: subclasses implement _load/save_many/list_users/version."""
+
+    def __init__(self, default_data=None):
+        self.default_data = default_data or {"income": 0.0, "expenses": 0.0, "risk_profile": "Medium", "goals": []}
+
+    def load(self, username):
+        """Return the user's profile dict, creating it from the defaults if missing."""
+        data = self._load(username)
+        if data is None:
+            data = copy.deepcopy(self.default_data)
+            self.save(username, data)
+        return data
+
+    def get(self, username):
+        """Return the user's profile dict, or None if it does not exist."""
+        return self._load(username)
+
+    def save(self, username, data):
+        self.save_many([(username, data)])
+
+    def save_many(self, items):
+        raise NotImplementedError
+
+    def save_changes(self, username, data, goal_positions):
+        """
+        Persist profile-level fields plus only the goals at goal_positions.
+        Stores without row-level granularity rewrite the whole profile.
+        """
+        self.save(username, data)
+
+    def _load(self, username):
+        raise NotImplementedError
+
+    def list_users(self):
+        raise NotImplementedError
+
+    def version(self, username):
+        """Opaque value that changes whenever the user's profile is saved."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonFileStore(ProfileStore):
+    """One JSON file per user in data_dir (the original on-disk layout)."""
+
+    def __init__(self, data_dir="data", default_data=None):
+        super().__init__(default_data)
+        self.data_dir = data_dir
+
+    def path(self, username):
+        return os.path.join(self.data_dir, f"{username}{USER_SUFFIX}")
+
+    def _load(self, username):
+        try:
+            with open(self.path(username), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # missing or corrupt: caller resets to defaults
+
+    def save_many(self, items):
+        os.makedirs(self.data_dir, exist_ok=True)
+        for username, data in items:
+            path = self.path(username)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+
+    def list_users(self):
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(f[:-len(USER_SUFFIX)] for f in os.listdir(self.data_dir) if f.endswith(USER_SUFFIX))
+
+    def version(self, username):
+        try:
+            return os.stat(self.path(username)).st_mtime_ns
+        except OSError:
+            return None
+
+
+class SQLiteStore(ProfileStore):
+    """
+    SQLite-backed store. Profiles and goals are separate per-user rows; any
+    extra profile or goal keys (email, completed_goals, ...) are kept as JSON.
+    Connections are pooled and safe to share across Streamlit session threads.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS profiles (
+        username TEXT PRIMARY KEY,
+        income REAL,
+        expenses REAL,
+        risk_profile TEXT,
+        extra TEXT NOT NULL DEFAULT '{}',
+        version INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS goals (
+        username TEXT NOT NULL REFERENCES profiles(username) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        name TEXT,
+        target_amount REAL,
+        current_amount REAL,
+        deadline TEXT,
+        priority INTEGER,
+        extra TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (username, position)
+    );
+    """
+
+    def __init__(self, db_path="data/finai.db", default_data=None, pool_size=8, timeout=30.0):
+        super().__init__(default_data)
+        self.db_path = db_path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _load(self, username):
+        with self._connection() as conn:
+            # One read transaction: both SELECTs see the same WAL snapshot, never half a save
+            conn.execute("BEGIN")
+            try:
+                profile = conn.execute(
+                    "SELECT income, expenses, risk_profile, extra FROM profiles WHERE username = ?", (username,)
+                ).fetchone()
+                goal_rows = conn.execute(
+                    "SELECT name, target_amount, current_amount, deadline, priority, extra "
+                    "FROM goals WHERE username = ? ORDER BY position", (username,)
+                ).fetchall() if profile is not None else []
+            finally:
+                conn.execute("COMMIT")
+        if profile is None:
+            return None
+        data = dict(zip(PROFILE_FIELDS, profile[:3]))
+        data["goals"] = []
+        for row in goal_rows:
+            goal = dict(zip(GOAL_FIELDS, row[:5]))
+            goal.update(json.loads(row[5]))
+            data["goals"].append(goal)
+        data.update(json.loads(profile[3]))
+        return data
+
+    _UPSERT_PROFILE = (
+        "INSERT INTO profiles (username, income, expenses, risk_profile, extra, version, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, 1, ?) "
+        "ON CONFLICT(username) DO UPDATE SET income = excluded.income, expenses = excluded.expenses, "
+        "risk_profile = excluded.risk_profile, extra = excluded.extra, "
+        "version = profiles.version + 1, updated_at = excluded.updated_at"
+    )
+    _INSERT_GOAL = (
+        "INSERT OR REPLACE INTO goals (username, position, name, target_amount, current_amount, deadline, priority, extra) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    @staticmethod
+    def _profile_row(username, data, now):
+        extra = {k: v for k, v in data.items() if k not in PROFILE_FIELDS and k != "goals"}
+        return (username, *(data.get(k) for k in PROFILE_FIELDS), json.dumps(extra), now)
+
+    @staticmethod
+    def _goal_row(username, pos, goal):
+        extra = {k: v for k, v in goal.items() if k not in GOAL_FIELDS and k not in DERIVED_GOAL_FIELDS}
+        return (username, pos, *(goal.get(k) for k in GOAL_FIELDS), json.dumps(extra))
+
+    def save_many(self, items):
+        """Upsert many profiles (and replace their goals) in one transaction."""
+        now = time.time()
+        with self._transaction() as conn:
+            for username, data in items:
+                conn.execute(self._UPSERT_PROFILE, self._profile_row(username, data, now))
+                conn.execute("DELETE FROM goals WHERE username = ?", (username,))
+                conn.executemany(self._INSERT_GOAL, [
+                    self._goal_row(username, pos, goal) for pos, goal in enumerate(data.get("goals", []))
+                ])
+
+    def save_changes(self, username, data, goal_positions):
+        """Upsert the profile row and rewrite only the listed goal rows, in one transaction."""
+        goals = data.get("goals", [])
+        with self._transaction() as conn:
+            conn.execute(self._UPSERT_PROFILE, self._profile_row(username, data, time.time()))
+            conn.executemany(self._INSERT_GOAL, [
+                self._goal_row(username, pos, goals[pos]) for pos in goal_positions
+            ])
+
+    def list_users(self):
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute("SELECT username FROM profiles ORDER BY username")]
+
+    def version(self, username):
+        with self._connection() as conn:
+            row = conn.execute("SELECT version FROM profiles WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def open_store(url, default_data=None):
+    """Build a store from a URL: 'json:<data_dir>' or 'sqlite:<db_path>'."""
+    kind, _, location = url.partition(":")
+    if kind == "json":
+        return JsonFileStore(location or "data", default_data)
+    if kind == "sqlite":
+        return SQLiteStore(location or "data/finai.db", default_data)
+    raise ValueError(f"Unknown profile store: {url!r}")
+
+
+def import_json_profiles(store, data_dir="data", batch_size=500):
+    """Bulk-load every data_dir/*_user.json into store. Returns the number imported."""
+    source = JsonFileStore(data_dir)
+    batch, count = [], 0
+    for username in source.list_users():
+        data = source.get(username)
+        if data is None:
+            continue
+        batch.append((username, data))
+        if len(batch) >= batch_size:
+            store.save_many(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        store.save_many(batch)
+        count += len(batch)
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m modules.storage <data_dir> <sqlite_db_path>")
+    imported = import_json_profiles(SQLiteStore(sys.argv[2]), sys.argv[1])
+    print(f"Imported {imported} profiles into {sys.argv[2]}")
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from modules import activity_log
+
+
+def _entry(ts, action="Updated goal", details="Car"):
+    return {"timestamp": ts, "action": action, "details": details}
+
+
+def _months_of_entries():
+    """Three entries in each month of 2024-01..2024-04, oldest first."""
+    return [_entry(f"2024-{month:02d}-{day:02d} 10:00:00", details=("Car", "House")[day % 2])
+            for month in range(1, 5) for day in (3, 10, 17)]
+
+
+def test_legacy_log_is_migrated_once_oldest_first(tmp_path):
+    log_dir = str(tmp_path)
+    entries = _months_of_entries()
+    with open(activity_log.get_legacy_path("bob", log_dir), "w") as f:
+        json.dump(list(reversed(entries)), f)  # legacy files are newest first
+    assert activity_log.migrate_legacy_log("bob", log_dir) == len(entries)
+    assert activity_log.migrate_legacy_log("bob", log_dir) == 0
+    assert os.path.exists(activity_log.get_legacy_path("bob", log_dir) + ".bak")
+    assert list(activity_log.iter_user_activity("bob", log_dir)) == entries
+    assert activity_log.get_user_activity("bob", limit=2, log_dir=log_dir) == entries[:-3:-1]
+
+
+def test_rotation_archives_past_months_without_losing_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(activity_log, "RETENTION_MONTHS", 0)  # keep 2024 segments when appends auto-rotate
+    log_dir = str(tmp_path)
+    entries = _months_of_entries()
+    activity_log.append_entries("bob", entries, log_dir)
+    before = activity_log.log_version("bob", log_dir)
+
+    archived = activity_log.rotate_log("bob", log_dir, retention_months=0, now=datetime(2024, 4, 20))
+    assert archived == 9
+    assert activity_log.list_segments("bob", log_dir) == ["2024-01", "2024-02", "2024-03"]
+    assert activity_log.read_segment("bob", "2024-02", log_dir) == entries[3:6]
+    assert list(activity_log.iter_user_activity("bob", log_dir)) == entries
+    assert activity_log.get_user_activity("bob", limit=None, log_dir=log_dir) == entries[::-1]
+    assert activity_log.log_version("bob", log_dir) != before
+
+    # Goal queries span the active log and the archives, newest first
+    page, has_more = activity_log.query_activity("bob", goal="car", page_size=100, log_dir=log_dir)
+    assert page == [e for e in reversed(entries) if e["details"] == "Car"] and not has_more
+
+    # Appends after a rotation land in the rewritten log and its index
+    activity_log.log_user_activity("bob", "Updated goal", "Boat", log_dir=log_dir)
+    assert activity_log.get_user_activity("bob", limit=1, log_dir=log_dir)[0]["details"] == "Boat"
+    assert list(activity_log.iter_user_activity("bob", log_dir))[:-1] == entries
+
+
+def test_retention_drops_old_segments(tmp_path):
+    log_dir = str(tmp_path)
+    activity_log.append_entries("bob", _months_of_entries(), log_dir)
+    activity_log.rotate_log("bob", log_dir, retention_months=2, now=datetime(2024, 4, 20))
+    assert activity_log.list_segments("bob", log_dir) == ["2024-02", "2024-03"]
+
+
+def test_log_version_changes_when_rotation_keeps_the_size(tmp_path):
+    log_dir = str(tmp_path)
+    activity_log.append_entries("bob", [_entry("2024-01-03 10:00:00"), _entry("2024-01-04 10:00:00")], log_dir)
+    before = activity_log.log_version("bob", log_dir)
+    activity_log.rotate_log("bob", log_dir, retention_months=0, now=datetime(2024, 2, 1))
+    activity_log.append_entries("bob", [_entry("2024-02-03 10:00:00"), _entry("2024-02-04 10:00:00")], log_dir)
+    after = activity_log.log_version("bob", log_dir)
+    assert after[1] == before[1] and after != before
+    assert activity_log.log_version("nobody", log_dir) == (0, 0)
+
+
+def test_concurrent_appends_for_many_users(tmp_path):
+    log_dir = str(tmp_path)
+
+    def append(user):
+        for i in range(100):
+            activity_log.log_user_activity(user, "Updated goal", f"{user} {i}", log_dir=log_dir)
+    threads = [threading.Thread(target=append, args=(f"user{k}",)) for k in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for k in range(6):
+        details = [e["details"] for e in activity_log.iter_user_activity(f"user{k}", log_dir)]
+        assert details == [f"user{k} {i}" for i in range(100)]
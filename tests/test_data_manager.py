@@ -0,0 +1,51 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from modules import data_manager, goal_history, goal_records
+from modules.storage import open_store
+
+
+def _random_stamps(n, seed):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    stamps = [start + timedelta(days=rng.randrange(0, 365 * 12), seconds=rng.choice([0, rng.randrange(86400)]))
+              for _ in range(n)]
+    # Month ends and leap days are where day clipping matters
+    stamps += [datetime(2024, 2, 29), datetime(2025, 2, 28), datetime(2025, 1, 31, 12), datetime(2025, 4, 30)]
+    return stamps
+
+
+@pytest.mark.parametrize("as_of", [datetime(2025, 9, 24), datetime(2025, 1, 31), datetime(2024, 2, 29, 18, 30)])
+def test_months_until_matches_relativedelta(as_of):
+    deadlines = pd.Series(_random_stamps(500, seed=as_of.day))
+    deltas = [relativedelta(d, as_of) for d in deadlines]
+    expected = [delta.years * 12 + delta.months for delta in deltas]
+    assert data_manager.months_until(deadlines, as_of).tolist() == expected
+
+
+def test_goal_records_match_goals_dataframe():
+    goals = [
+        {"name": f"g{i}", "target_amount": 1000.0 + i, "current_amount": 50.0 * i,
+         "deadline": d.strftime("%Y-%m-%d"), "priority": i % 5 + 1}
+        for i, d in enumerate(_random_stamps(50, seed=1))
+    ]
+    df = data_manager.get_goals_dataframe(goals)
+    records = goal_records.build_records(goals)
+    assert [r.months_left for r in records] == df["months_left"].tolist()
+    assert [r.required_monthly for r in records] == pytest.approx(df["required_monthly"].tolist())
+
+
+def test_goal_session_add_goal_accepts_date_deadlines(tmp_path, monkeypatch):
+    monkeypatch.setattr(goal_history, "HISTORY_DIR", str(tmp_path))
+    store = open_store(f"json:{tmp_path}", default_data=data_manager.DEFAULT_DATA)
+    session = data_manager.GoalSession("alice", store.load("alice"), store=store)
+    session.add_goal({"name": "Car", "target_amount": 100.0, "current_amount": 0.0,
+                      "deadline": date(2027, 3, 1), "priority": 3})
+    session.add_goal({"name": "Boat", "target_amount": 100.0, "current_amount": 0.0,
+                      "deadline": pd.Timestamp("2027-04-01"), "priority": 3})
+    assert session.flush()
+    assert [g["deadline"] for g in store.load("alice")["goals"][-2:]] == ["2027-03-01", "2027-04-01"]
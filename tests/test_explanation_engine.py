@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks import synthetic
+from modules import data_manager, explanation_engine, planning_engine
+
+
+def _original_explanations(reason_tags):
+    """explain_allocations as first written: one TEMPLATES entry per tag, STANDARD otherwise."""
+    explanations = {}
+    for tag_info in reason_tags:
+        goal, tag = tag_info["goal"], tag_info["tag"]
+        explanation = explanation_engine.TEMPLATES.get(tag, explanation_engine.TEMPLATES["STANDARD"]).format(goal=goal)
+        if tag_info["allocate"] > 0:
+            explanation += f" Allocating ${tag_info['allocate']:.2f} ({tag_info['months_left']} months left)."
+        elif "GOAL_COMPLETE" in tag:
+            explanation += " No allocation needed."
+        explanations[goal] = explanation
+    return explanations
+
+
+@pytest.mark.parametrize("tag", list(explanation_engine.TEMPLATES))
+@pytest.mark.parametrize("alloc", [0.0, 1234.5])
+def test_templated_tags_read_as_before(tag, alloc):
+    reason_tags = [{"goal": "Car", "tag": tag, "allocate": alloc, "months_left": 7}]
+    assert explanation_engine.explain_allocations(reason_tags) == _original_explanations(reason_tags)
+
+
+def test_compound_tags_are_composed_from_their_parts():
+    tags = planning_engine._tag_lookup()
+    for tag in tags:
+        text = explanation_engine.explain_one("Car", tag, 0.0, 3)
+        parts = explanation_engine.split_tag(tag) or []
+        assert parts or tag == "STANDARD"
+        for part in parts:
+            if part not in ("HIGH_PRIORITY", "DEADLINE_APPROACHING"):
+                assert explanation_engine.TEMPLATES[part].format(goal="Car") in text
+    assert explanation_engine.explain_one("Car", "HIGH_PRIORITY_DEADLINE_APPROACHING_UNDERFUNDED", 10.0, 2) == (
+        "I'm prioritizing Car because it's high-priority and the deadline is near. "
+        "This goal is underfunded this month due to limited savings. Allocating $10.00 (2 months left)."
+    )
+
+
+def test_explain_columns_matches_explain_allocations():
+    goals_frame, savings = synthetic.generate_goals_frame(100, seed=2)
+    plan = planning_engine.plan_allocations_batch(data_manager.get_goals_dataframe(goals_frame), savings)
+    plan["explanation"] = explanation_engine.explain_columns(plan["name"], plan["tag"], plan["allocate"],
+                                                             plan["months_left"])
+    for user, rows in plan.groupby("user_id", sort=False):
+        _, reason_tags = planning_engine.batch_results_for_user(plan, user)
+        tagged = rows["tag"].notna()
+        assert dict(zip(rows["name"][tagged], rows["explanation"][tagged])) == \
+            explanation_engine.explain_allocations(reason_tags)
+        assert (rows["explanation"][~tagged] == "").all()
@@ -0,0 +1,25 @@
+import pytest
+
+from modules import data_manager, monte_carlo
+
+
+@pytest.fixture(scope="module")
+def goals_df():
+    return data_manager.get_goals_dataframe(data_manager.DEFAULT_DATA["goals"])
+
+
+def test_results_do_not_depend_on_worker_count(goals_df):
+    runs = [
+        monte_carlo.simulate_goal_success(goals_df, 2000.0, "Medium", n_paths=3000, seed=11,
+                                          workers=workers, block_size=500)
+        for workers in (1, 2, 3)
+    ]
+    assert runs[0] == runs[1] == runs[2]
+
+
+def test_seed_makes_runs_reproducible(goals_df):
+    first = monte_carlo.simulate_goal_success(goals_df, 2000.0, "High", n_paths=1000, seed=5, workers=1)
+    again = monte_carlo.simulate_goal_success(goals_df, 2000.0, "High", n_paths=1000, seed=5, workers=1)
+    assert first == again
+    assert set(first) == set(goals_df["name"])
+    assert all(0.0 <= p <= 1.0 for p in first.values())
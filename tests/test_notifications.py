@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from modules.notifications import EmailQueue, MemoryTransport, SMTPTransport, MESSAGE_SUFFIX
+
+
+class LocalSMTPServer:
+    """
+    SMTP stand-in on 127.0.0.1: speaks just enough SMTP for smtplib (no
+    STARTTLS or AUTH), records each message and counts connections.
+    drop_after=N closes a connection after N messages, to test reconnects.
+    """
+
+    def __init__(self, drop_after=None):
+        self.messages = []
+        self.connections = 0
+        self.drop_after = drop_after
+        self._lock = threading.Lock()
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # closed
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._session, args=(conn,), daemon=True).start()
+
+    def _session(self, conn):
+        reader = conn.makefile("rb")
+
+        def reply(line):
+            conn.sendall(line.encode("ascii") + b"\r\n")
+
+        sent = 0
+        try:
+            reply("220 localhost test SMTP")
+            for raw in reader:
+                command = raw.decode("utf-8", "replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    reply("250 localhost")
+                elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                    reply("250 OK")
+                elif command == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    for data in reader:
+                        if data in (b".\r\n", b".\n"):
+                            break
+                        lines.append(data)
+                    with self._lock:
+                        self.messages.append(b"".join(lines).decode("utf-8", "replace"))
+                    reply("250 Queued")
+                    sent += 1
+                    if self.drop_after and sent >= self.drop_after:
+                        return  # simulate the server dropping the connection
+                elif command == "QUIT":
+                    reply("221 Bye")
+                    return
+                else:
+                    reply("502 Command not implemented")
+        except OSError:
+            pass
+        finally:
+            reader.close()
+            conn.close()
+
+
+def _smtp_queue(outbox, server, workers=2):
+    factory = functools.partial(SMTPTransport, host=server.host, port=server.port, user="",
+                                sender="finai@localhost", starttls=False, timeout=5.0)
+    return EmailQueue(str(outbox), factory, workers=workers, backoff_base=0.05, backoff_max=0.2)
+
+
+def _deliver(queue, count):
+    queue.start()
+    queue.enqueue_many([(f"user{i}@example.com", f"Reminder {i}", "Body") for i in range(count)])
+    flushed = queue.flush(timeout=60)
+    queue.stop()
+    return flushed
+
+
+def test_smtp_transport_reuses_connections(tmp_path):
+    with LocalSMTPServer() as server:
+        queue = _smtp_queue(tmp_path, server, workers=2)
+        assert _deliver(queue, 200)
+    assert queue.stats["sent"] == len(server.messages) == 200
+    assert server.connections <= 2
+
+
+def test_smtp_transport_reconnects_after_drops(tmp_path):
+    with LocalSMTPServer(drop_after=25) as server:
+        queue = _smtp_queue(tmp_path, server)
+        assert _deliver(queue, 200)
+    assert queue.stats["sent"] == len(server.messages) == 200
+    assert server.connections >= 200 // 25
+
+
+@pytest.mark.parametrize("content", ["{not json", "[1, 2]", json.dumps({"id": "x", "to": "a@example.com"})])
+def test_unreadable_outbox_file_is_quarantined(tmp_path, content):
+    with open(tmp_path / ("bad" + MESSAGE_SUFFIX), "w") as f:
+        f.write(content)
+    transport = MemoryTransport()
+    queue = EmailQueue(str(tmp_path), transport, workers=1)
+    assert _deliver(queue, 3)
+    assert queue.stats["failed"] == 1
+    assert len(transport.sent) == 3
+    assert os.path.exists(tmp_path / "failed" / ("bad" + MESSAGE_SUFFIX))
+
+
+def test_worker_survives_write_failure(tmp_path, monkeypatch):
+    transport = MemoryTransport(failures=1)
+    queue = EmailQueue(str(tmp_path), transport, workers=1, backoff_base=0.01, backoff_max=0.05)
+    real_write = queue._write
+    calls = []
+
+    def flaky_write(path, message):
+        if message.get("attempts") and not calls:
+            calls.append(path)
+            raise OSError("disk full")
+        real_write(path, message)
+    monkeypatch.setattr(queue, "_write", flaky_write)
+    assert _deliver(queue, 2)
+    assert calls and len(transport.sent) == 2
+
+
+def test_memory_transport_keeps_only_recent_messages():
+    transport = MemoryTransport(sent_kept=10)
+    for i in range(25):
+        transport.send({"to": f"user{i}@example.com", "subject": str(i)})
+    assert [m["subject"] for m in transport.sent] == [str(i) for i in range(15, 25)]
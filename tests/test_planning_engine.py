@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from modules import data_manager, goal_records, planning_engine, projection_engine
+
+
+@pytest.fixture(scope="module")
+def users():
+    """[(goals_df, goal dicts, monthly savings)] for synthetic users, savings from scarce to ample."""
+    goals_frame, savings = synthetic.generate_goals_frame(150, seed=7)
+    goals_frame = data_manager.get_goals_dataframe(goals_frame)
+    result = []
+    for i, (user, rows) in enumerate(goals_frame.groupby("user_id", sort=False)):
+        rows = rows.drop(columns="user_id").reset_index(drop=True)
+        goals = rows[list(goal_records.GOAL_FIELDS)].to_dict(orient="records")
+        result.append((user, rows, goals, (0.0, -10.0, 250.0, float(savings[user]), 1e7)[i % 5]))
+    return goals_frame, result
+
+
+def _tags(reason_tags):
+    return [(t["goal"], t["tag"], t["months_left"]) for t in reason_tags]
+
+
+def _assert_same_plan(expected, actual):
+    (allocations, reason_tags), (other_allocations, other_tags) = expected, actual
+    assert list(allocations) == list(other_allocations)
+    assert list(other_allocations.values()) == pytest.approx(list(allocations.values()))
+    assert _tags(other_tags) == _tags(reason_tags)
+    assert [t["allocate"] for t in other_tags] == pytest.approx([t["allocate"] for t in reason_tags])
+
+
+@pytest.mark.parametrize("mode", planning_engine.PLANNING_MODES)
+def test_plan_records_matches_plan_allocations(users, mode):
+    for _, rows, goals, savings in users[1]:
+        _assert_same_plan(planning_engine.plan_allocations(rows, savings, mode),
+                          goal_records.plan_records(goal_records.build_records(goals), savings, mode))
+
+
+def test_plan_allocations_batch_matches_plan_allocations(users):
+    goals_frame, per_user = users
+    savings = {user: value for user, _, _, value in per_user}
+    plan = planning_engine.plan_allocations_batch(goals_frame, savings)
+    for user, rows, _, value in per_user:
+        _assert_same_plan(planning_engine.plan_allocations(rows, value),
+                          planning_engine.batch_results_for_user(plan, user))
+
+
+def test_unknown_mode_is_rejected(users):
+    _, rows, goals, savings = users[1][0]
+    with pytest.raises(ValueError):
+        planning_engine.plan_allocations(rows, savings, "random")
+    with pytest.raises(ValueError):
+        goal_records.plan_records(goal_records.build_records(goals), savings, "random")
+
+
+def test_water_fill_spends_savings_within_caps():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        need = rng.uniform(0, 500, size=rng.integers(1, 10))
+        weight = rng.integers(1, 6, size=len(need))
+        savings = rng.uniform(0, need.sum() * 1.5)
+        alloc = planning_engine.water_fill_allocations(need, weight, savings)
+        assert np.all(alloc >= 0) and np.all(alloc <= need + 1e-9)
+        assert alloc.sum() == pytest.approx(min(savings, need.sum()))
+        # Goals below their cap share one level per unit of weight
+        open_goals = alloc < need - 1e-9
+        if open_goals.sum() > 1:
+            levels = alloc[open_goals] / weight[open_goals]
+            assert levels == pytest.approx(np.full(len(levels), levels[0]))
+
+
+@pytest.mark.parametrize("mode", planning_engine.PLANNING_MODES)
+def test_projection_starts_from_the_plan(users, mode):
+    for _, rows, _, savings in users[1][:60]:
+        allocations, _ = projection_engine.project_plan(rows, savings, mode=mode)
+        if allocations.empty:
+            continue
+        planned, _ = planning_engine.plan_allocations(rows, savings, mode)
+        assert allocations.iloc[0].to_dict() == pytest.approx(planned)